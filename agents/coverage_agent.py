@@ -30,7 +30,7 @@ class CoverageTypeAgent:
         print(f"🔍 Analyzing coverage patterns for {len(df)} claims...")
         
         # Step 1: Group data by pharmacy_number
-        pharmacy_groups = df.groupby('pharmacy_number')
+        pharmacy_groups = df.groupby('pharmacy_number', observed=True)
         
         results = []
         
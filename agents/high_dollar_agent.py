@@ -35,7 +35,7 @@ class HighDollarClaimAgent:
         print(f"✅ Found {len(high_dollar_claims)} high-dollar claims")
         
         # Group by pharmacy for analysis
-        pharmacy_groups = high_dollar_claims.groupby('pharmacy_number')
+        pharmacy_groups = high_dollar_claims.groupby('pharmacy_number', observed=True)
         results = []
         
         for pharmacy_number, group in pharmacy_groups:
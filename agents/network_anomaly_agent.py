@@ -53,7 +53,7 @@ class PharmacyNetworkAnomalyAgent:
             pd.DataFrame: Network analysis results
         """
         # Group by pharmacy and analyze network status
-        pharmacy_groups = df.groupby('pharmacy_number')
+        pharmacy_groups = df.groupby('pharmacy_number', observed=True)
         results = []
         
         for pharmacy_number, group in pharmacy_groups:
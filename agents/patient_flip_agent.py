@@ -41,7 +41,7 @@ class PatientFlipAgent:
         print(f"✅ Filtered to {len(filtered_df)} claims with relevant coverage types")
 
         group_columns = ['patient_id', 'product_ndc', 'pharmacy_number']
-        groups = filtered_df.groupby(group_columns)
+        groups = filtered_df.groupby(group_columns, observed=True)
 
         results = []
         total_groups = len(groups)
@@ -46,7 +46,7 @@ class PatientFlipAgentEnhanced:
         
         # Step 2: Group by patient, product, and pharmacy
         group_columns = ['patient_id', 'product_ndc', 'pharmacy_number']
-        groups = filtered_df.groupby(group_columns)
+        groups = filtered_df.groupby(group_columns, observed=True)
         
         results = []
         total_groups = len(groups)
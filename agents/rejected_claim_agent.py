@@ -25,7 +25,7 @@ class RejectedClaimDensityAgent:
         df_with_rejections['has_rejection'] = self._has_rejection_indicator(df_with_rejections)
         
         # Count total claims and rejected claims per pharmacy
-        pharmacy_groups = df_with_rejections.groupby('pharmacy_number')
+        pharmacy_groups = df_with_rejections.groupby('pharmacy_number', observed=True)
         results = []
         
         for pharmacy_number, group in pharmacy_groups:
@@ -1,5 +1,5 @@
 import pandas as pd
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from utils.db_loader import AzureSynapseLoader
 from utils.weighted_scoring import SupervisorAgent
@@ -15,6 +15,10 @@ class ParallelFraudDetectionState(TypedDict):
 
 def load_data_node(state: ParallelFraudDetectionState) -> ParallelFraudDetectionState:
     """Load data from Azure Synapse."""
+    if state.get("df") is not None:
+        print(f"✅ Using provided data: {len(state['df'])} rows")
+        return state
+    
     print("🔄 Loading data from Azure Synapse...")
     try:
         loader = AzureSynapseLoader()
@@ -43,8 +47,8 @@ def parallel_analysis_node(state: ParallelFraudDetectionState) -> ParallelFraudD
         # Initialize supervisor
         supervisor = SupervisorAgent()
         
-        # Run supervised analysis
-        results = supervisor.supervise_analysis(df)
+        # Run supervised analysis, reusing agent results when they were provided
+        results = supervisor.supervise_analysis(df, agent_results=state.get("agent_results"))
         
         state["agent_results"] = results["agent_results"]
         state["weighted_results"] = results["weighted_results"]
@@ -77,16 +81,14 @@ def final_results_node(state: ParallelFraudDetectionState) -> ParallelFraudDetec
             state["final_results"] = pd.DataFrame()
             return state
         
-        # Sort by weighted score (highest risk first)
-        final_results = weighted_results.sort_values('weighted_score', ascending=False).copy()
+        # Sort by weighted score (highest risk first); sort_values already returns a new frame
+        final_results = weighted_results.sort_values('weighted_score', ascending=False)
         
         # Add additional details
         final_results['rank'] = range(1, len(final_results) + 1)
         
         # Also update weighted_results with rank for Streamlit compatibility
-        weighted_results_with_rank = weighted_results.sort_values('weighted_score', ascending=False).copy()
-        weighted_results_with_rank['rank'] = range(1, len(weighted_results_with_rank) + 1)
-        state["weighted_results"] = weighted_results_with_rank
+        state["weighted_results"] = final_results.copy()
         
         print(f"✅ Final results prepared: {len(final_results)} pharmacies ranked by risk")
         state["final_results"] = final_results
@@ -119,15 +121,32 @@ def build_parallel_graph() -> StateGraph:
     return graph
 
 
-def run_parallel_fraud_detection_pipeline() -> Dict[str, Any]:
-    """Run the complete parallel fraud detection pipeline."""
+def run_parallel_fraud_detection_pipeline(agent_results: Optional[Dict[str, pd.DataFrame]] = None,
+                                          df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Run the complete parallel fraud detection pipeline.
+    
+    Args:
+        agent_results (dict, optional): Precomputed agent results; when given the
+            agents are not run again. Requires the df they were computed on.
+        df (pd.DataFrame, optional): Claim data to analyze instead of loading it
+            from Azure Synapse
+    """
+    if agent_results is not None and df is None:
+        raise ValueError("agent_results must be passed with the df they were computed on")
+    
     print("🚀 Starting Parallel Fraud Detection Pipeline")
     print("=" * 50)
     
     try:
         # Build and run graph
         graph = build_parallel_graph()
-        result = graph.invoke({})
+        initial_state = {}
+        if df is not None:
+            initial_state["df"] = df
+        if agent_results is not None:
+            initial_state["agent_results"] = agent_results
+        result = graph.invoke(initial_state)
         
         print("=" * 50)
         print("✅ Parallel Pipeline completed successfully!")
@@ -0,0 +1,146 @@
+"""
+Copay data and agent result loaders shared by the agent test scripts.
+
+The copay detail data is loaded from Azure Synapse once per process and
+reused by every test that needs it. Both the pytest fixtures in
+``conftest.py`` and the scripts' ``__main__`` runners import these helpers,
+so ``python tests/test_*.py`` also benefits.
+
+Under pytest-xdist (``pytest tests/ -n auto --dist=loadfile``) each worker
+is its own process; a file lock around the Parquet snapshot makes sure only
+one of them queries Synapse while the others wait and read the snapshot.
+"""
+
+import glob
+import hashlib
+import os
+import sys
+from functools import lru_cache
+
+import pandas as pd
+from filelock import FileLock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+COPAY_TABLE = "dbo.rpt_copay_detail_bc_ext"
+
+# Low-cardinality string columns the agents group and filter on
+CATEGORY_COLUMNS = [
+    'coverage_type', 'pharmacy_state', 'agent_source',
+    'network_pharmacy_group_type', 'primary_network_type'
+]
+
+
+def categorize(df):
+    """Convert the low-cardinality string columns present in ``df`` to ``category`` dtype."""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+@lru_cache(maxsize=1)
+def get_loader():
+    """Shared AzureSynapseLoader so every test reuses one loader and its connection."""
+    from utils.db_loader import AzureSynapseLoader
+    
+    return AzureSynapseLoader()
+
+
+def _schema_hash(table_columns, selected_columns):
+    """Short hash of the table's column layout and the selected columns, used to key snapshots."""
+    layout = [f"{c['COLUMN_NAME']}:{c['DATA_TYPE']}" for c in table_columns]
+    return hashlib.sha1(",".join(layout + ["|"] + selected_columns).encode("utf-8")).hexdigest()[:12]
+
+
+def load_copay_df(limit=10000):
+    """
+    Load copay detail data once per process, with categorical string columns.
+    
+    Args:
+        limit (int): Number of rows to load (default: 10000)
+        
+    Returns:
+        pandas.DataFrame: Loaded data
+    """
+    return _load_copay_df(limit)
+
+
+@lru_cache(maxsize=None)
+def _load_copay_df(limit):
+    return categorize(_load_copay_snapshot(limit))
+
+
+def _load_copay_snapshot(limit):
+    """
+    Load copay detail data from a local snapshot or Azure Synapse.
+    
+    Only the loader's ``COPAY_REQUIRED_COLUMNS`` are selected.
+    Snapshots are stored as Parquet under ``tests/.cache`` keyed by table,
+    row limit and a hash of the table schema and selected columns, so a
+    schema change invalidates them automatically. When Synapse is
+    unreachable the most recent snapshot for the table and limit is used
+    instead. Set ``PYTEST_REFRESH_CACHE=1`` to force a fresh load.
+    
+    Args:
+        limit (int): Number of rows to load (default: 10000)
+        
+    Returns:
+        pandas.DataFrame: Loaded data
+    """
+    refresh = os.getenv("PYTEST_REFRESH_CACHE") == "1"
+    key = f"{COPAY_TABLE}_{limit}"
+    
+    try:
+        from utils.db_loader import COPAY_REQUIRED_COLUMNS
+        
+        loader = get_loader()
+        table_columns = loader.get_columns(COPAY_TABLE)
+        snapshot_path = os.path.join(
+            CACHE_DIR, f"{key}_{_schema_hash(table_columns, list(COPAY_REQUIRED_COLUMNS))}.parquet"
+        )
+    except Exception as e:
+        # Offline: fall back to the newest snapshot for this table and limit
+        snapshots = sorted(glob.glob(os.path.join(CACHE_DIR, f"{key}_*.parquet")), key=os.path.getmtime)
+        if refresh or not snapshots:
+            raise
+        print(f"⚠️ Synapse unavailable ({e}), using snapshot {snapshots[-1]}")
+        return pd.read_parquet(snapshots[-1], engine="pyarrow", use_threads=True)
+    
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    
+    # Only one xdist worker builds a given snapshot; the rest read it once it exists
+    with FileLock(snapshot_path + ".lock"):
+        if os.path.exists(snapshot_path) and not refresh:
+            return pd.read_parquet(snapshot_path, engine="pyarrow", use_threads=True)
+        
+        df = loader.load_copay_detail_data(limit=limit)
+        
+        try:
+            df.to_parquet(snapshot_path, engine="pyarrow", compression="zstd", index=False)
+        except Exception as e:
+            print(f"⚠️ Could not write data snapshot {snapshot_path}: {e}")
+    
+    return df
+
+
+def load_agent_results(limit=1000):
+    """
+    Run all fraud agents once per process on the copay data sample.
+    
+    Args:
+        limit (int): Number of rows of copay data to analyze (default: 1000)
+        
+    Returns:
+        dict: Agent name to results DataFrame
+    """
+    return _load_agent_results(limit)
+
+
+@lru_cache(maxsize=None)
+def _load_agent_results(limit):
+    from utils.weighted_scoring import WeightedScoringSystem
+    
+    return WeightedScoringSystem().run_agents_parallel(load_copay_df(limit=limit))
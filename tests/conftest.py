@@ -0,0 +1,27 @@
+"""
+Shared pytest fixtures for the agent test scripts.
+
+The data behind them is loaded once per process by the helpers in ``_data``.
+"""
+
+import pytest
+
+from _data import load_agent_results, load_copay_df
+
+
+@pytest.fixture(scope="session")
+def copay_df():
+    """Copay detail data shared by the agent tests (10,000 rows)."""
+    return load_copay_df(limit=10000)
+
+
+@pytest.fixture(scope="session")
+def copay_df_small():
+    """Smaller copay detail sample for the parallel execution test (1,000 rows)."""
+    return load_copay_df(limit=1000)
+
+
+@pytest.fixture(scope="session")
+def agent_results(copay_df_small):
+    """Agent results for the small copay sample, shared by the parallel system tests."""
+    return load_agent_results(limit=1000)
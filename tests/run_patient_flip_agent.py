@@ -46,9 +46,10 @@ def run_patient_flip_agent_on_real_data():
             print()
         
         # Summary statistics
-        high_risk = len(results[results['fraud_score'] >= 0.8])
-        medium_risk = len(results[(results['fraud_score'] >= 0.6) & (results['fraud_score'] < 0.8)])
-        low_risk = len(results[results['fraud_score'] < 0.6])
+        scores = results['fraud_score'].to_numpy()
+        high_risk = int((scores >= 0.8).sum())
+        medium_risk = int(((scores >= 0.6) & (scores < 0.8)).sum())
+        low_risk = int((scores < 0.6).sum())
         
         print(f"📊 Risk Distribution:")
         print(f"   • High Risk (≥80%): {high_risk} patterns")
@@ -4,23 +4,20 @@ Test the enhanced PatientFlipAgent on real data.
 """
 
 import pandas as pd
+import numpy as np
 import sys
 import os
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def test_enhanced_patient_flip_agent():
+def test_enhanced_patient_flip_agent(copay_df):
     """Test the enhanced PatientFlipAgent on real data."""
     
     print("🧪 Testing Enhanced PatientFlipAgent on Real Data")
     print("=" * 60)
     
-    # Load real data
-    from utils.db_loader import AzureSynapseLoader
-    
-    loader = AzureSynapseLoader()
-    df = loader.load_copay_detail_data(limit=10000)
+    df = copay_df
     
     print(f"📊 Loaded {len(df)} claims from Azure Synapse")
     
@@ -35,25 +32,26 @@ def test_enhanced_patient_flip_agent():
     
     if not results.empty:
         print(f"\n🔍 Top Enhanced Flip Patterns Found:")
-        for i, (_, row) in enumerate(results.head(5).iterrows()):
-            print(f"   {i+1}. Patient: {row['patient_id']}")
-            print(f"      Pharmacy: {row['pharmacy_name']} ({row['pharmacy_city']}, {row['pharmacy_state']})")
-            print(f"      Product: {row['product_name']} (NDC: {row['product_ndc']})")
-            print(f"      Number of Flips: {row['number_of_flips']}")
-            print(f"      Total Claims: {row['total_claims']}")
-            print(f"      Fraud Score: {row['fraud_score']}")
-            print(f"      Reason: {row['reason']}")
+        for i, row in enumerate(results.head(5).itertuples(index=False), 1):
+            print(f"   {i}. Patient: {row.patient_id}")
+            print(f"      Pharmacy: {row.pharmacy_name} ({row.pharmacy_city}, {row.pharmacy_state})")
+            print(f"      Product: {row.product_name} (NDC: {row.product_ndc})")
+            print(f"      Number of Flips: {row.number_of_flips}")
+            print(f"      Total Claims: {row.total_claims}")
+            print(f"      Fraud Score: {row.fraud_score}")
+            print(f"      Reason: {row.reason}")
             print()
         
         # Summary statistics
-        high_risk = len(results[results['fraud_score'] >= 0.8])
-        medium_risk = len(results[(results['fraud_score'] >= 0.6) & (results['fraud_score'] < 0.8)])
-        low_risk = len(results[results['fraud_score'] < 0.6])
+        risk_counts = pd.cut(
+            results['fraud_score'], bins=[-np.inf, 0.6, 0.8, np.inf],
+            labels=['low', 'medium', 'high'], right=False
+        ).value_counts()
         
         print(f"📊 Risk Distribution:")
-        print(f"   • High Risk (≥80%): {high_risk} patterns")
-        print(f"   • Medium Risk (60-79%): {medium_risk} patterns")
-        print(f"   • Low Risk (<60%): {low_risk} patterns")
+        print(f"   • High Risk (≥80%): {risk_counts['high']} patterns")
+        print(f"   • Medium Risk (60-79%): {risk_counts['medium']} patterns")
+        print(f"   • Low Risk (<60%): {risk_counts['low']} patterns")
         
     else:
         print("   • No enhanced flip patterns detected")
@@ -64,4 +62,5 @@ def test_enhanced_patient_flip_agent():
     return results
 
 if __name__ == "__main__":
-    test_enhanced_patient_flip_agent() 
\ No newline at end of file
+    from _data import load_copay_df
+    test_enhanced_patient_flip_agent(load_copay_df(limit=10000)) 
\ No newline at end of file
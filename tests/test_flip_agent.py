@@ -14,93 +14,44 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 def create_test_data():
     """Create test data with insurance-to-cash flip patterns."""
     
-    # Create sample data with flip patterns
-    test_data = []
-    
-    # Test case 1: Clear flip pattern
     base_date = datetime(2024, 1, 1)
+    n_flips = 2
     
-    # Insurance claim first (rejected)
-    test_data.append({
-        'patient_id': 'TEST_PATIENT_001',
-        'product_ndc': '12345678901',
-        'pharmacy_number': 'TEST_PHARMACY_001',
-        'pharmacy_name': 'Test Pharmacy 1',
-        'pharmacy_city': 'Test City',
-        'pharmacy_state': 'TS',
-        'product_name': 'Test Drug 1',
-        'coverage_type': 'Commercial',
-        'date_submitted': base_date,
-        'pa_rejection_code_1': 'REJECTED',
-        'latest_pa_status_desc': 'Denied',
-        'transaction_id': 'INS_001'
-    })
-    
-    # Cash claim second (after rejection)
-    test_data.append({
-        'patient_id': 'TEST_PATIENT_001',
-        'product_ndc': '12345678901',
-        'pharmacy_number': 'TEST_PHARMACY_001',
-        'pharmacy_name': 'Test Pharmacy 1',
-        'pharmacy_city': 'Test City',
-        'pharmacy_state': 'TS',
-        'product_name': 'Test Drug 1',
-        'coverage_type': 'Cash',
-        'date_submitted': base_date + timedelta(days=7),
-        'pa_rejection_code_1': '',
-        'latest_pa_status_desc': '',
-        'transaction_id': 'CASH_001'
-    })
+    # Claims per test case:
+    #   1. Clear flip pattern - rejected insurance claim, then cash a week later
+    #   2. Multiple flips - insurance then cash, repeated every two weeks
+    #   3. No flip pattern (should not be detected) - a single cash claim
+    claims_per_case = [2, 2 * n_flips, 1]
     
-    # Test case 2: Multiple flips
-    for i in range(2):
-        # Insurance claim
-        test_data.append({
-            'patient_id': 'TEST_PATIENT_002',
-            'product_ndc': '98765432109',
-            'pharmacy_number': 'TEST_PHARMACY_002',
-            'pharmacy_name': 'Test Pharmacy 2',
-            'pharmacy_city': 'Test City 2',
-            'pharmacy_state': 'TS',
-            'product_name': 'Test Drug 2',
-            'coverage_type': 'Medicare',
-            'date_submitted': base_date + timedelta(days=i*14),
-            'pa_rejection_code_1': 'REJECTED',
-            'latest_pa_status_desc': 'Rejected',
-            'transaction_id': f'INS_002_{i}'
-        })
-        
-        # Cash claim
-        test_data.append({
-            'patient_id': 'TEST_PATIENT_002',
-            'product_ndc': '98765432109',
-            'pharmacy_number': 'TEST_PHARMACY_002',
-            'pharmacy_name': 'Test Pharmacy 2',
-            'pharmacy_city': 'Test City 2',
-            'pharmacy_state': 'TS',
-            'product_name': 'Test Drug 2',
-            'coverage_type': 'Cash',
-            'date_submitted': base_date + timedelta(days=i*14 + 7),
-            'pa_rejection_code_1': '',
-            'latest_pa_status_desc': '',
-            'transaction_id': f'CASH_002_{i}'
-        })
+    def per_case(*values):
+        """Repeat one value per test case across that case's claims."""
+        return [value for value, count in zip(values, claims_per_case) for _ in range(count)]
     
-    # Test case 3: No flip pattern (should not be detected)
-    test_data.append({
-        'patient_id': 'TEST_PATIENT_003',
-        'product_ndc': '55555555555',
-        'pharmacy_number': 'TEST_PHARMACY_003',
-        'pharmacy_name': 'Test Pharmacy 3',
-        'pharmacy_city': 'Test City 3',
-        'pharmacy_state': 'TS',
-        'product_name': 'Test Drug 3',
-        'coverage_type': 'Cash',
-        'date_submitted': base_date,
-        'pa_rejection_code_1': '',
-        'latest_pa_status_desc': '',
-        'transaction_id': 'CASH_ONLY_001'
-    })
+    # Build columns directly (dict of lists) so pandas doesn't infer dtypes row by row
+    test_data = {
+        'patient_id': per_case('TEST_PATIENT_001', 'TEST_PATIENT_002', 'TEST_PATIENT_003'),
+        'product_ndc': per_case('12345678901', '98765432109', '55555555555'),
+        'pharmacy_number': per_case('TEST_PHARMACY_001', 'TEST_PHARMACY_002', 'TEST_PHARMACY_003'),
+        'pharmacy_name': per_case('Test Pharmacy 1', 'Test Pharmacy 2', 'Test Pharmacy 3'),
+        'pharmacy_city': per_case('Test City', 'Test City 2', 'Test City 3'),
+        'pharmacy_state': pd.Categorical(per_case('TS', 'TS', 'TS')),
+        'product_name': per_case('Test Drug 1', 'Test Drug 2', 'Test Drug 3'),
+        'coverage_type': pd.Categorical(
+            ['Commercial', 'Cash'] + ['Medicare', 'Cash'] * n_flips + ['Cash']
+        ),
+        'date_submitted': pd.to_datetime(
+            [base_date, base_date + timedelta(days=7)]
+            + [base_date + timedelta(days=i*14 + offset) for i in range(n_flips) for offset in (0, 7)]
+            + [base_date]
+        ),
+        'pa_rejection_code_1': ['REJECTED', ''] + ['REJECTED', ''] * n_flips + [''],
+        'latest_pa_status_desc': ['Denied', ''] + ['Rejected', ''] * n_flips + [''],
+        'transaction_id': (
+            ['INS_001', 'CASH_001']
+            + [f'{kind}_002_{i}' for i in range(n_flips) for kind in ('INS', 'CASH')]
+            + ['CASH_ONLY_001']
+        ),
+    }
     
     return pd.DataFrame(test_data)
 
@@ -124,13 +75,13 @@ def test_patient_flip_agent():
     
     if not results.empty:
         print(f"   • Sample findings:")
-        for i, (_, row) in enumerate(results.head(3).iterrows()):
-            print(f"     {i+1}. Patient: {row['patient_id']}")
-            print(f"        Pharmacy: {row['pharmacy_name']}")
-            print(f"        Product: {row['product_name']}")
-            print(f"        Flips: {row['number_of_flips']}")
-            print(f"        Fraud Score: {row['fraud_score']}")
-            print(f"        Reason: {row['reason']}")
+        for i, row in enumerate(results.head(3).itertuples(index=False), 1):
+            print(f"     {i}. Patient: {row.patient_id}")
+            print(f"        Pharmacy: {row.pharmacy_name}")
+            print(f"        Product: {row.product_name}")
+            print(f"        Flips: {row.number_of_flips}")
+            print(f"        Fraud Score: {row.fraud_score}")
+            print(f"        Reason: {row.reason}")
             print()
     else:
         print("   • No flip patterns detected in test data")
@@ -6,11 +6,12 @@ Test script for PharmacyNetworkAnomalyAgent
 import sys
 import os
 import pandas as pd
+import numpy as np
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def test_network_agent():
+def test_network_agent(copay_df):
     """Test the PharmacyNetworkAnomalyAgent with real data."""
     print("🧪 Testing PharmacyNetworkAnomalyAgent...")
     print("=" * 50)
@@ -19,18 +20,14 @@ def test_network_agent():
         # Import the agent
         from agents.network_anomaly_agent import PharmacyNetworkAnomalyAgent
         
-        # Load real data
-        from utils.db_loader import AzureSynapseLoader
-        
-        print("📊 Loading data from Azure Synapse...")
-        loader = AzureSynapseLoader()
-        df = loader.load_copay_detail_data(limit=10000)
+        df = copay_df
         
         print(f"✅ Loaded {len(df)} rows with {len(df.columns)} columns")
         
         # Check if required columns exist
         required_columns = ['is_network_pharmacy', 'network_pharmacy_group_type', 'pharmacy_number']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        have = frozenset(df.columns)
+        missing_columns = [col for col in required_columns if col not in have]
         
         if missing_columns:
             print(f"⚠️ Missing required columns: {missing_columns}")
@@ -51,33 +48,41 @@ def test_network_agent():
         print(f"   • Columns in results: {list(results.columns)}")
         
         # Show high-risk findings
-        high_risk = results[results['fraud_score'] >= 0.8]
-        medium_risk = results[(results['fraud_score'] >= 0.6) & (results['fraud_score'] < 0.8)]
+        risk_counts = pd.cut(
+            results['fraud_score'], bins=[-np.inf, 0.6, 0.8, np.inf],
+            labels=['low', 'medium', 'high'], right=False
+        ).value_counts()
+        
+        print(f"   • High risk (≥80%): {risk_counts['high']} pharmacies")
+        print(f"   • Medium risk (60-79%): {risk_counts['medium']} pharmacies")
+        
+        head5 = results.head(5)
+        print("\n📋 Top 5 findings:")
+        print(head5.to_string())
+        
+        network_stats = results.agg({
+            'network_claims': 'sum', 'non_network_claims': 'sum', 'is_primarily_network': 'sum'
+        })
+        network_percentage = results['network_percentage'].to_numpy(copy=False)
+        print(f"\n🏥 Network statistics:")
+        print(f"   • Total network claims: {int(network_stats['network_claims'])}")
+        print(f"   • Total non-network claims: {int(network_stats['non_network_claims'])}")
+        print(f"   • Average network percentage: {network_percentage.mean():.1f}%")
+        print(f"   • Pharmacies primarily network: {int(network_stats['is_primarily_network'])}")
         
-        print(f"   • High risk (≥80%): {len(high_risk)} pharmacies")
-        print(f"   • Medium risk (60-79%): {len(medium_risk)} pharmacies")
+        print(f"\n📊 Network type breakdown:")
+        network_types = results['primary_network_type'].value_counts()
+        for network_type, count in network_types.items():
+            print(f"   • {network_type}: {count} pharmacies")
         
-        if not results.empty:
-            print("\n📋 Top 5 findings:")
-            print(results.head().to_string())
-            
-            print(f"\n🏥 Network statistics:")
-            print(f"   • Total network claims: {results['network_claims'].sum()}")
-            print(f"   • Total non-network claims: {results['non_network_claims'].sum()}")
-            print(f"   • Average network percentage: {results['network_percentage'].mean():.1f}%")
-            print(f"   • Pharmacies primarily network: {results['is_primarily_network'].sum()}")
-            
-            print(f"\n📊 Network type breakdown:")
-            network_types = results['primary_network_type'].value_counts()
-            for network_type, count in network_types.items():
-                print(f"   • {network_type}: {count} pharmacies")
-            
-            # Show pharmacies with highest non-network percentages
-            high_non_network = results.nlargest(5, 'non_network_claims')
-            print(f"\n🏆 Top 5 pharmacies by non-network claims:")
-            for _, row in high_non_network.iterrows():
-                non_network_pct = 100 - row['network_percentage']
-                print(f"   • {row['pharmacy_name']} ({row['pharmacy_state']}): {row['non_network_claims']} non-network claims ({non_network_pct:.1f}%)")
+        # Show pharmacies with highest non-network percentages
+        top5 = results.nlargest(5, 'non_network_claims')[
+            ['pharmacy_name', 'pharmacy_state', 'non_network_claims', 'network_percentage']
+        ].copy()
+        top5['non_network_pct'] = 100.0 - top5['network_percentage'].to_numpy()
+        print(f"\n🏆 Top 5 pharmacies by non-network claims:")
+        for row in top5.itertuples(index=False):
+            print(f"   • {row.pharmacy_name} ({row.pharmacy_state}): {row.non_network_claims} non-network claims ({row.non_network_pct:.1f}%)")
         
     except Exception as e:
         print(f"❌ Error testing PharmacyNetworkAnomalyAgent: {e}")
@@ -85,4 +90,5 @@ def test_network_agent():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    test_network_agent() 
\ No newline at end of file
+    from _data import load_copay_df
+    test_network_agent(load_copay_df(limit=10000)) 
\ No newline at end of file
@@ -6,11 +6,12 @@ Test script for RejectedClaimDensityAgent
 import sys
 import os
 import pandas as pd
+import numpy as np
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def test_rejection_agent():
+def test_rejection_agent(copay_df):
     """Test the RejectedClaimDensityAgent with real data."""
     print("🧪 Testing RejectedClaimDensityAgent...")
     print("=" * 50)
@@ -19,12 +20,7 @@ def test_rejection_agent():
         # Import the agent
         from agents.rejected_claim_agent import RejectedClaimDensityAgent
         
-        # Load real data
-        from utils.db_loader import AzureSynapseLoader
-        
-        print("📊 Loading data from Azure Synapse...")
-        loader = AzureSynapseLoader()
-        df = loader.load_copay_detail_data(limit=10000)
+        df = copay_df
         
         print(f"✅ Loaded {len(df)} rows with {len(df.columns)} columns")
         
@@ -34,7 +30,8 @@ def test_rejection_agent():
             'pa_rejection_code_1', 'pa_rejection_code_2', 
             'latest_pa_status_desc', 'pharmacy_number'
         ]
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        have = frozenset(df.columns)
+        missing_columns = [col for col in required_columns if col not in have]
         
         if missing_columns:
             print(f"⚠️ Missing required columns: {missing_columns}")
@@ -55,32 +52,39 @@ def test_rejection_agent():
         print(f"   • Columns in results: {list(results.columns)}")
         
         # Show high-risk findings
-        high_risk = results[results['fraud_score'] >= 0.8]
-        medium_risk = results[(results['fraud_score'] >= 0.6) & (results['fraud_score'] < 0.8)]
+        risk_counts = pd.cut(
+            results['fraud_score'], bins=[-np.inf, 0.6, 0.8, np.inf],
+            labels=['low', 'medium', 'high'], right=False
+        ).value_counts()
+        
+        print(f"   • High risk (≥80%): {risk_counts['high']} pharmacies")
+        print(f"   • Medium risk (60-79%): {risk_counts['medium']} pharmacies")
+        
+        head5 = results.head(5)
+        print("\n📋 Top 5 findings:")
+        print(head5.to_string())
+        
+        totals = results[[
+            'rejected_claims', 'primary_rejections', 'pa_rejections',
+            'status_rejections', 'total_rejection_types'
+        ]].sum()
+        rejection_percentage = results['rejection_percentage'].to_numpy(copy=False)
+        print(f"\n🚫 Rejection statistics:")
+        print(f"   • Total rejected claims across all findings: {int(totals['rejected_claims'])}")
+        print(f"   • Average rejection percentage: {rejection_percentage.mean():.1f}%")
+        print(f"   • Highest rejection percentage: {rejection_percentage.max():.1f}%")
         
-        print(f"   • High risk (≥80%): {len(high_risk)} pharmacies")
-        print(f"   • Medium risk (60-79%): {len(medium_risk)} pharmacies")
+        print(f"\n📊 Rejection type breakdown:")
+        print(f"   • Total primary rejections: {int(totals['primary_rejections'])}")
+        print(f"   • Total PA rejections: {int(totals['pa_rejections'])}")
+        print(f"   • Total status rejections: {int(totals['status_rejections'])}")
+        print(f"   • Total rejection types: {int(totals['total_rejection_types'])}")
         
-        if not results.empty:
-            print("\n📋 Top 5 findings:")
-            print(results.head().to_string())
-            
-            print(f"\n🚫 Rejection statistics:")
-            print(f"   • Total rejected claims across all findings: {results['rejected_claims'].sum()}")
-            print(f"   • Average rejection percentage: {results['rejection_percentage'].mean():.1f}%")
-            print(f"   • Highest rejection percentage: {results['rejection_percentage'].max():.1f}%")
-            
-            print(f"\n📊 Rejection type breakdown:")
-            print(f"   • Total primary rejections: {results['primary_rejections'].sum()}")
-            print(f"   • Total PA rejections: {results['pa_rejections'].sum()}")
-            print(f"   • Total status rejections: {results['status_rejections'].sum()}")
-            print(f"   • Total rejection types: {results['total_rejection_types'].sum()}")
-            
-            # Show pharmacies with highest rejection rates
-            high_rejection = results.nlargest(5, 'rejection_percentage')
-            print(f"\n🏆 Top 5 pharmacies by rejection percentage:")
-            for _, row in high_rejection.iterrows():
-                print(f"   • {row['pharmacy_name']} ({row['pharmacy_state']}): {row['rejection_percentage']:.1f}% ({row['rejected_claims']}/{row['total_claims']} claims)")
+        # Show pharmacies with highest rejection rates
+        top5 = results.nlargest(5, 'rejection_percentage')
+        print(f"\n🏆 Top 5 pharmacies by rejection percentage:")
+        for row in top5.itertuples(index=False):
+            print(f"   • {row.pharmacy_name} ({row.pharmacy_state}): {row.rejection_percentage:.1f}% ({row.rejected_claims}/{row.total_claims} claims)")
         
     except Exception as e:
         print(f"❌ Error testing RejectedClaimDensityAgent: {e}")
@@ -88,4 +92,5 @@ def test_rejection_agent():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    test_rejection_agent() 
\ No newline at end of file
+    from _data import load_copay_df
+    test_rejection_agent(load_copay_df(limit=10000)) 
\ No newline at end of file
@@ -7,17 +7,29 @@ Tests both agents, filtering, and export functionality.
 import pandas as pd
 import sys
 import os
+import io
+from functools import lru_cache
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+@lru_cache(maxsize=1)
+def _get_results():
+    """Run the fraud detection pipeline once and share its output across tests."""
+    from langgraph.fraud_graph import run_fraud_detection_pipeline
+    from _data import categorize
+    
+    results = run_fraud_detection_pipeline()
+    if results is not None and "results" in results:
+        categorize(results["results"])
+    return results
+
 def test_pipeline_results():
     """Test that the pipeline returns results from both agents."""
     print("🧪 Testing Pipeline Results...")
     
     try:
-        from langgraph.fraud_graph import run_fraud_detection_pipeline
-        results = run_fraud_detection_pipeline()
+        results = _get_results()
         
         if results is None or "results" not in results:
             print("❌ No results returned from pipeline")
@@ -54,8 +66,7 @@ def test_agent_filtering():
     print("\n🧪 Testing Agent Filtering...")
     
     try:
-        from langgraph.fraud_graph import run_fraud_detection_pipeline
-        results = run_fraud_detection_pipeline()
+        results = _get_results()
         results_df = results["results"]
         
         # Test coverage agent filter
@@ -67,8 +78,8 @@ def test_agent_filtering():
         print(f"✅ Flip agent filter: {len(flip_results)} findings")
         
         # Test fraud score filtering
-        high_risk = results_df[results_df['fraud_score'] >= 0.8]
-        print(f"✅ High risk filter (≥80%): {len(high_risk)} findings")
+        high_risk_count = int((results_df['fraud_score'] >= 0.8).sum())
+        print(f"✅ High risk filter (≥80%): {high_risk_count} findings")
         
         return True
         
@@ -81,21 +92,22 @@ def test_export_functionality():
     print("\n🧪 Testing Export Functionality...")
     
     try:
-        from langgraph.fraud_graph import run_fraud_detection_pipeline
-        results = run_fraud_detection_pipeline()
+        results = _get_results()
         results_df = results["results"]
         
-        # Test CSV export
-        csv_data = results_df.to_csv(index=False)
-        if len(csv_data) > 0:
+        # Test CSV export (written to an in-memory handle; only the size is checked)
+        csv_buffer = io.BytesIO()
+        results_df.to_csv(csv_buffer, index=False)
+        if csv_buffer.tell() > 0:
             print("✅ CSV export works")
         else:
             print("❌ CSV export failed")
             return False
         
         # Test JSON export
-        json_data = results_df.to_json(orient='records', indent=2)
-        if len(json_data) > 0:
+        json_buffer = io.BytesIO()
+        results_df.to_json(json_buffer, orient='records', indent=2)
+        if json_buffer.tell() > 0:
             print("✅ JSON export works")
         else:
             print("❌ JSON export failed")
@@ -112,21 +124,21 @@ def test_search_functionality():
     print("\n🧪 Testing Search Functionality...")
     
     try:
-        from langgraph.fraud_graph import run_fraud_detection_pipeline
-        results = run_fraud_detection_pipeline()
+        results = _get_results()
         results_df = results["results"]
         
         # Test pharmacy name search
         if 'pharmacy_name' in results_df.columns:
             sample_pharmacy = results_df['pharmacy_name'].iloc[0]
-            search_results = results_df[results_df['pharmacy_name'].str.contains(sample_pharmacy, case=False, na=False)]
+            search_results = results_df[results_df['pharmacy_name'].str.contains(sample_pharmacy, case=False, na=False, regex=False)]
             print(f"✅ Pharmacy search works: {len(search_results)} results for '{sample_pharmacy}'")
         
         # Test patient ID search (for flip agent results)
         flip_results = results_df[results_df['agent_source'] == 'patient_flip_agent']
         if not flip_results.empty and 'patient_id' in flip_results.columns:
             sample_patient = flip_results['patient_id'].iloc[0]
-            search_results = flip_results[flip_results['patient_id'].astype(str).str.contains(str(sample_patient), case=False, na=False)]
+            patient_ids = flip_results['patient_id'].astype(str)
+            search_results = flip_results[patient_ids.str.contains(str(sample_patient), case=False, na=False, regex=False)]
             print(f"✅ Patient ID search works: {len(search_results)} results for patient {sample_patient}")
         
         return True
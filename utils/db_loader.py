@@ -1,4 +1,7 @@
 import os
+import time
+from urllib.parse import quote
+import connectorx as cx
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
@@ -8,13 +11,50 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns of dbo.rpt_copay_detail_bc_ext read by the fraud agents, the weighted
+# scoring and the dashboards' raw claim views
+COPAY_REQUIRED_COLUMNS = (
+    # Pharmacy, patient and product identifiers
+    'pharmacy_number', 'pharmacy_name', 'pharmacy_city', 'pharmacy_state',
+    'patient_id', 'product_ndc', 'product_name',
+    # Claim identifiers shown with the raw claims
+    'transaction_id', 'rx_id', 'prescriber_npi', 'date_filled',
+    # Coverage and patient flip analysis
+    'coverage_type', 'occ', 'date_submitted',
+    # Rejections
+    'claim_cob_primary_reject_code1', 'claim_cob_primary_reject_code2',
+    'pa_rejection_code_1', 'pa_rejection_code_2',
+    'latest_pa_status_code', 'latest_pa_status_desc',
+    # Costs
+    'copay_cost', 'oop_cost', 'copay_fee_cost', 'original_cost',
+    # Network
+    'is_network_pharmacy', 'network_pharmacy_group_type',
+)
+
+# Tables the metadata helpers may query; table names cannot be bound as parameters
+ALLOWED_TABLES = {"dbo.rpt_copay_detail_bc_ext"}
+
+# A successful connection test is trusted for this long before pinging again
+PING_CACHE_SECONDS = 30
+
+# Partitioned reads only pay off once the result is large
+PARTITION_MIN_ROWS = 50_000
+
+# connectorx can only split a query on an integer column
+PARTITION_COLUMN_TYPES = {'tinyint', 'smallint', 'int', 'bigint'}
+
 class AzureSynapseLoader:
     """
     A class to handle connections and data loading from Azure Synapse SQL.
     """
     
-    def __init__(self):
-        """Initialize the loader and load environment variables."""
+    def __init__(self, ttl_seconds=300):
+        """
+        Initialize the loader and load environment variables.
+        
+        Args:
+            ttl_seconds (int): How long a cached table row count stays valid (default: 300)
+        """
         load_dotenv()
         self.host = "aytusynapseworkspace2-ondemand.sql.azuresynapse.net"
         self.port = 1433
@@ -25,6 +65,14 @@ class AzureSynapseLoader:
         
         if not self.user or not self.password:
             raise ValueError("DB_USER and DB_PASSWORD must be set in .env file")
+        
+        self._engine = None
+        self._last_ping_ok = None
+        
+        # Table metadata caches: column lists never expire, row counts after ttl_seconds
+        self.ttl_seconds = ttl_seconds
+        self._columns_cache = {}
+        self._row_count_cache = {}
     
     def create_connection_string(self):
         """Create the SQLAlchemy connection string."""
@@ -35,41 +83,123 @@ class AzureSynapseLoader:
         )
         return connection_string
     
+    @property
+    def engine(self):
+        """SQLAlchemy engine shared by every query on this loader, created on first use."""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.create_connection_string(),
+                pool_size=4,
+                max_overflow=8,
+                pool_pre_ping=True,
+                fast_executemany=True
+            )
+        return self._engine
+    
+    def close(self):
+        """Dispose of the engine and its pooled connections."""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+    
+    def _cx_url(self):
+        """Create the connectorx connection URL for bulk reads."""
+        return (
+            f"mssql://{quote(self.user, safe='')}:{quote(self.password, safe='')}@"
+            f"{self.host}:{self.port}/{quote(self.database, safe='')}"
+            f"?encrypt=true"
+        )
+    
     def test_connection(self):
-        """Test the database connection."""
+        """Test the database connection, reusing a successful result for PING_CACHE_SECONDS."""
+        if self._last_ping_ok is not None and time.monotonic() - self._last_ping_ok[0] < PING_CACHE_SECONDS:
+            return self._last_ping_ok[1]
+        
         try:
-            engine = create_engine(self.create_connection_string())
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT 1"))
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
                 logger.info("Database connection successful!")
+                self._last_ping_ok = (time.monotonic(), True)
                 return True
         except Exception as e:
             logger.error(f"Database connection failed: {str(e)}")
             return False
     
-    def load_copay_detail_data(self, limit=10000):
+    @staticmethod
+    def quote_identifier(name):
+        """Quote a column name for T-SQL."""
+        return "[" + str(name).replace("]", "]]") + "]"
+    
+    def load_copay_detail_data(self, limit=10000, columns=COPAY_REQUIRED_COLUMNS, as_arrow=False, batch_size=None,
+                               chunksize=None, iterator=False, need_downcast=False,
+                               partition_on=None, partition_num=4):
         """
         Load data from dbo.rpt_copay_detail_bc_ext table.
         
         Args:
-            limit (int): Number of rows to load (default: 10000)
+            limit (int, optional): Number of rows to load (default: 10000); None loads every row
+            columns (list, optional): Columns to select (default: COPAY_REQUIRED_COLUMNS);
+                None selects every column. Names not in the table are skipped.
+            as_arrow (bool): Return Arrow data instead of a pandas DataFrame
+            batch_size (int, optional): With as_arrow, stream record batches of
+                this many rows (e.g. 50_000) instead of building one table;
+                requires as_arrow
+            chunksize (int, optional): With iterator, stream the rows as DataFrames
+                of this many rows
+            iterator (bool): Return an iterator over chunksize-row DataFrames
+                instead of one DataFrame; requires chunksize
+            need_downcast (bool): Downcast numeric columns to the smallest dtype that
+                holds them and store low-cardinality strings as categoricals
+            partition_on (str, optional): Selected integer column to split the read on,
+                so connectorx fetches partition_num ranges over parallel connections.
+                Only for unlimited reads (limit=None), since each partition would
+                re-run an unordered TOP. Ignored for tables up to PARTITION_MIN_ROWS
+                rows and for streamed reads.
+            partition_num (int): Number of parallel partitions (default: 4)
             
         Returns:
-            pandas.DataFrame: Loaded data
+            pandas.DataFrame: Loaded data, an iterator of DataFrames when chunksize and
+            iterator are set, or a pyarrow.Table / pyarrow.RecordBatchReader when
+            as_arrow is set
         """
+        if bool(chunksize) != bool(iterator):
+            raise ValueError("chunksize and iterator must be used together")
+        if batch_size and not as_arrow:
+            raise ValueError("batch_size requires as_arrow=True")
+        
         try:
-            engine = create_engine(self.create_connection_string())
+            if columns is not None:
+                columns = self._validate_columns(columns)
+            select_list = ", ".join(self.quote_identifier(col) for col in columns) if columns is not None else "*"
+            top = f"TOP {int(limit)} " if limit is not None else ""
             
             # Build the query
             query = f"""
-            SELECT TOP {limit} *
+            SELECT {top}{select_list}
             FROM dbo.rpt_copay_detail_bc_ext
             """
             
-            logger.info(f"Loading {limit} rows from dbo.rpt_copay_detail_bc_ext...")
+            logger.info(f"Loading {limit if limit is not None else 'all'} rows from dbo.rpt_copay_detail_bc_ext...")
             
-            # Execute query and load into DataFrame
-            df = pd.read_sql(query, engine)
+            partition = self._partition_options(partition_on, partition_num, limit, columns)
+            
+            if as_arrow and batch_size:
+                logger.info(f"Streaming in batches of {batch_size} rows")
+                return cx.read_sql(self._cx_url(), query, return_type="arrow_stream", batch_size=batch_size)
+            
+            if as_arrow:
+                table = cx.read_sql(self._cx_url(), query, return_type="arrow", **partition)
+                logger.info(f"Successfully loaded {table.num_rows} rows")
+                return table
+            
+            if iterator:
+                return self._iter_chunks(query, chunksize, need_downcast=need_downcast)
+            
+            # Execute query and load into DataFrame; connectorx builds the
+            # columns natively instead of fetching row by row through pyodbc
+            df = cx.read_sql(self._cx_url(), query, return_type="pandas", **partition)
+            if need_downcast:
+                df = self._downcast(df)
             
             logger.info(f"Successfully loaded {len(df)} rows")
             return df
@@ -78,6 +208,95 @@ class AzureSynapseLoader:
             logger.error(f"Error loading data: {str(e)}")
             raise
     
+    def _validate_columns(self, columns, table_name="dbo.rpt_copay_detail_bc_ext"):
+        """
+        Keep only the requested columns that exist in the table; raise ValueError if none do.
+        
+        Args:
+            columns (list): Requested column names
+            table_name (str): Table the columns are selected from
+            
+        Returns:
+            list: The requested columns present in the table, in request order
+        """
+        available = {col['COLUMN_NAME'] for col in self.get_columns(table_name)}
+        unknown = [col for col in columns if col not in available]
+        valid = [col for col in columns if col in available]
+        if not valid:
+            raise ValueError(f"None of the requested columns exist in {table_name}: {list(columns)}")
+        if unknown:
+            logger.warning(f"Skipping columns not in {table_name}: {unknown}")
+        return valid
+    
+    def _partition_options(self, partition_on, partition_num, limit, columns,
+                           table_name="dbo.rpt_copay_detail_bc_ext"):
+        """
+        Build the connectorx partitioning arguments for a read.
+        
+        Args:
+            partition_on (str, optional): Column to partition on
+            partition_num (int): Number of partitions
+            limit (int, optional): Number of rows being loaded; None for every row
+            columns (list, optional): Selected columns; None when selecting every column
+            table_name (str): Table the column belongs to
+            
+        Returns:
+            dict: partition_on/partition_num keyword arguments, or an empty dict
+            when the read should not be partitioned
+        """
+        if not partition_on:
+            return {}
+        
+        # connectorx runs the whole query once per partition; an unordered TOP
+        # can return different rows each time, so the parts would not add up
+        if limit is not None:
+            raise ValueError("partition_on requires an unlimited read (limit=None)")
+        if columns is not None and partition_on not in columns:
+            raise ValueError(f"partition_on must be one of the selected columns, got {partition_on!r}")
+        
+        column_types = {col['COLUMN_NAME']: col['DATA_TYPE'].lower() for col in self.get_columns(table_name)}
+        if column_types.get(partition_on) not in PARTITION_COLUMN_TYPES:
+            raise ValueError(f"partition_on must be an integer column of {table_name}, got {partition_on!r}")
+        
+        if self.get_row_count(table_name) <= PARTITION_MIN_ROWS:
+            return {}
+        
+        logger.info(f"Partitioning the read on {partition_on} into {partition_num} parts")
+        return {'partition_on': partition_on, 'partition_num': partition_num}
+    
+    def _iter_chunks(self, query, chunksize, need_downcast=False):
+        """Yield the query results as DataFrames of up to chunksize rows."""
+        reader = cx.read_sql(self._cx_url(), query, return_type="arrow_stream", batch_size=chunksize)
+        for batch in reader:
+            chunk = batch.to_pandas()
+            yield self._downcast(chunk) if need_downcast else chunk
+    
+    @staticmethod
+    def _downcast(df, categorize=True):
+        """
+        Shrink a DataFrame in place by downcasting its columns.
+        
+        Args:
+            df (pandas.DataFrame): Data to downcast
+            categorize (bool): Also convert string columns whose distinct values
+                are under half the row count to category dtype
+            
+        Returns:
+            pandas.DataFrame: The same DataFrame with smaller dtypes
+        """
+        for col in df.columns:
+            dtype = df[col].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                continue
+            if pd.api.types.is_integer_dtype(dtype):
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            elif pd.api.types.is_float_dtype(dtype):
+                df[col] = pd.to_numeric(df[col], downcast='float')
+            elif categorize and len(df) and pd.api.types.is_string_dtype(dtype):
+                if df[col].nunique() / len(df) < 0.5:
+                    df[col] = df[col].astype('category')
+        return df
+    
     def get_table_info(self, table_name="dbo.rpt_copay_detail_bc_ext"):
         """
         Get basic information about the table.
@@ -89,38 +308,113 @@ class AzureSynapseLoader:
             dict: Table information
         """
         try:
-            engine = create_engine(self.create_connection_string())
+            return {
+                'table_name': table_name,
+                'row_count': self.get_row_count(table_name),
+                'columns': self.get_columns(table_name)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting table info: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _validate_table(table_name):
+        """Raise ValueError unless table_name is one of ALLOWED_TABLES."""
+        if table_name not in ALLOWED_TABLES:
+            raise ValueError(f"Unknown table {table_name!r}; expected one of {sorted(ALLOWED_TABLES)}")
+    
+    def get_row_count(self, table_name="dbo.rpt_copay_detail_bc_ext"):
+        """
+        Get the table's row count, cached for ttl_seconds.
+        
+        Args:
+            table_name (str): Name of the table to count
+            
+        Returns:
+            int: Number of rows in the table
+        """
+        cached = self._row_count_cache.get(table_name)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+        
+        self._validate_table(table_name)
+        
+        try:
+            count_query = text("SELECT COUNT(*) AS row_count FROM " + table_name)
+            with self.engine.connect() as conn:
+                row_count = conn.execute(count_query).scalar()
             
-            # Get row count
-            count_query = f"SELECT COUNT(*) as row_count FROM {table_name}"
-            count_result = pd.read_sql(count_query, engine)
-            row_count = count_result.iloc[0]['row_count']
+            self._row_count_cache[table_name] = (time.monotonic(), row_count)
+            return row_count
             
-            # Get column information
-            columns_query = f"""
+        except Exception as e:
+            logger.error(f"Error getting row count: {str(e)}")
+            raise
+    
+    def invalidate(self, table_name=None):
+        """
+        Drop cached metadata so the next lookup queries Synapse again.
+        
+        Args:
+            table_name (str, optional): Table to invalidate; all tables when omitted
+        """
+        if table_name is None:
+            self._columns_cache.clear()
+            self._row_count_cache.clear()
+        else:
+            self._columns_cache.pop(table_name, None)
+            self._row_count_cache.pop(table_name, None)
+    
+    def get_columns(self, table_name="dbo.rpt_copay_detail_bc_ext"):
+        """
+        Get column metadata for the table without scanning its rows.
+        
+        The result is cached for the lifetime of the loader; use invalidate()
+        after a schema change.
+        
+        Args:
+            table_name (str): Name of the table to inspect
+            
+        Returns:
+            list: One dict per column with COLUMN_NAME, DATA_TYPE and IS_NULLABLE
+        """
+        if table_name in self._columns_cache:
+            return list(self._columns_cache[table_name])
+        
+        self._validate_table(table_name)
+        schema, table = table_name.split('.')
+        
+        try:
+            columns_query = text("""
             SELECT 
                 COLUMN_NAME,
                 DATA_TYPE,
                 IS_NULLABLE
             FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_NAME = '{table_name.split('.')[-1]}'
-            AND TABLE_SCHEMA = '{table_name.split('.')[0]}'
+            WHERE TABLE_NAME = :table_name
+            AND TABLE_SCHEMA = :table_schema
             ORDER BY ORDINAL_POSITION
-            """
-            columns_info = pd.read_sql(columns_query, engine)
+            """).bindparams(table_name=table, table_schema=schema)
+            with self.engine.connect() as conn:
+                columns_info = [dict(row._mapping) for row in conn.execute(columns_query).fetchall()]
             
-            return {
-                'table_name': table_name,
-                'row_count': row_count,
-                'columns': columns_info.to_dict('records')
-            }
+            self._columns_cache[table_name] = columns_info
+            return list(self._columns_cache[table_name])
             
         except Exception as e:
-            logger.error(f"Error getting table info: {str(e)}")
+            logger.error(f"Error getting column info: {str(e)}")
             raise
 
-def main():
-    """Main function to demonstrate usage."""
+def main(as_arrow=False):
+    """
+    Main function to demonstrate usage.
+    
+    Args:
+        as_arrow (bool): Load the data as Arrow and keep Arrow-backed dtypes
+            in the returned DataFrame
+    """
+    loader = None
     try:
         # Initialize the loader
         loader = AzureSynapseLoader()
@@ -139,7 +433,10 @@ def main():
         
         # Load data
         print("\nLoading data...")
-        df = loader.load_copay_detail_data(limit=10000)
+        if as_arrow:
+            df = loader.load_copay_detail_data(limit=10000, as_arrow=True).to_pandas(types_mapper=pd.ArrowDtype)
+        else:
+            df = loader.load_copay_detail_data(limit=10000)
         
         print(f"Loaded DataFrame shape: {df.shape}")
         print(f"Columns: {list(df.columns)}")
@@ -151,6 +448,9 @@ def main():
     except Exception as e:
         print(f"Error in main: {str(e)}")
         return None
+    finally:
+        if loader is not None:
+            loader.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
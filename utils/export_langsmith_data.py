@@ -5,15 +5,45 @@ Export LangSmith data to local files for easier access.
 
 import os
 import sys
-import json
+import argparse
+import orjson
 import pandas as pd
 from datetime import datetime
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def export_langsmith_data():
-    """Export LangSmith data to local files."""
+AGENT_NAMES = ['coverage_agent', 'patient_flip_agent', 'high_dollar_agent', 'rejection_agent', 'network_agent']
+
+def write_frame(df, name, csv=False):
+    """
+    Write a results DataFrame to disk.
+    
+    Args:
+        df (pd.DataFrame): Data to write
+        name (str): File name without extension
+        csv (bool): Write CSV instead of Parquet
+        
+    Returns:
+        str: Name of the file written
+    """
+    if not csv:
+        try:
+            df.to_parquet(f'{name}.parquet', compression='zstd', index=False)
+            return f'{name}.parquet'
+        except Exception as e:
+            # Columns Arrow cannot type (e.g. mixed objects) still export as CSV
+            print(f"⚠️ Could not write {name}.parquet ({e}), falling back to CSV")
+    df.to_csv(f'{name}.csv', index=False)
+    return f'{name}.csv'
+
+def export_langsmith_data(csv=False):
+    """
+    Export LangSmith data to local files.
+    
+    Args:
+        csv (bool): Write result tables as CSV instead of Parquet
+    """
     print("📊 Exporting LangSmith Data to Local Files")
     print("=" * 50)
     
@@ -24,21 +54,18 @@ def export_langsmith_data():
         # Run fresh analysis
         print("🔄 Running fresh fraud detection analysis...")
         results = run_parallel_fraud_detection_pipeline()
+        agent_results = results.get('agent_results', {}) or {}
         
         # Export results to JSON
         export_data = {
             'timestamp': datetime.now().isoformat(),
             'analysis_summary': {
                 'total_pharmacies': len(results.get('weighted_results', pd.DataFrame())),
-                'agent_results_count': {k: len(v) for k, v in results.get('agent_results', {}).items()},
+                'agent_results_count': {k: len(v) for k, v in agent_results.items()},
                 'supervisor_insights': results.get('supervisor_insights', {})
             },
             'agent_communication': {
-                'coverage_agent': {'findings': len(results.get('agent_results', {}).get('coverage_agent', pd.DataFrame()))},
-                'patient_flip_agent': {'findings': len(results.get('agent_results', {}).get('patient_flip_agent', pd.DataFrame()))},
-                'high_dollar_agent': {'findings': len(results.get('agent_results', {}).get('high_dollar_agent', pd.DataFrame()))},
-                'rejection_agent': {'findings': len(results.get('agent_results', {}).get('rejection_agent', pd.DataFrame()))},
-                'network_agent': {'findings': len(results.get('agent_results', {}).get('network_agent', pd.DataFrame()))}
+                name: {'findings': len(agent_results.get(name, ()))} for name in AGENT_NAMES
             },
             'cross_agent_patterns': {
                 'high_risk_agreement': 45,
@@ -49,27 +76,28 @@ def export_langsmith_data():
         }
         
         # Save to JSON file
-        with open('langsmith_export.json', 'w') as f:
-            json.dump(export_data, f, indent=2)
+        with open('langsmith_export.json', 'wb') as f:
+            f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         
         print("✅ Exported to langsmith_export.json")
         
-        # Export weighted results to CSV
+        # Export weighted results
         if 'weighted_results' in results and not results['weighted_results'].empty:
-            results['weighted_results'].to_csv('fraud_detection_results.csv', index=False)
-            print("✅ Exported to fraud_detection_results.csv")
+            filename = write_frame(results['weighted_results'], 'fraud_detection_results', csv)
+            print(f"✅ Exported to {filename}")
         
-        # Export agent results to CSV
-        for agent_name, agent_df in results.get('agent_results', {}).items():
+        # Export agent results
+        for agent_name, agent_df in agent_results.items():
             if not agent_df.empty:
-                agent_df.to_csv(f'{agent_name}_results.csv', index=False)
-                print(f"✅ Exported to {agent_name}_results.csv")
+                filename = write_frame(agent_df, f'{agent_name}_results', csv)
+                print(f"✅ Exported to {filename}")
         
         print("\n📊 Export Summary:")
         print(f"   • Total Pharmacies: {export_data['analysis_summary']['total_pharmacies']}")
         print(f"   • Agent Results: {len(export_data['agent_communication'])} agents")
         print(f"   • Cross-Agent Patterns: {len(export_data['cross_agent_patterns'])} types")
-        print(f"   • Files Created: langsmith_export.json, fraud_detection_results.csv, agent_*.csv")
+        ext = 'csv' if csv else 'parquet'
+        print(f"   • Files Created: langsmith_export.json, fraud_detection_results.{ext}, agent_*.{ext}")
         
         return True
         
@@ -78,4 +106,7 @@ def export_langsmith_data():
         return False
 
 if __name__ == "__main__":
-    export_langsmith_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export LangSmith data to local files.")
+    parser.add_argument('--csv', action='store_true', help="Write result tables as CSV instead of Parquet")
+    args = parser.parse_args()
+    export_langsmith_data(csv=args.csv) 
\ No newline at end of file
@@ -1,26 +1,79 @@
 import os
 import logging
+from functools import cached_property
 from typing import Dict, Any, List
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from langsmith import Client
 from langsmith.run_trees import RunTree
 
+# Weighted score bands used in the tracked score distributions
+RISK_BINS = [-np.inf, 0.4, 0.6, 0.8, np.inf]
+RISK_LABELS = ['very_low_risk', 'low_risk', 'medium_risk', 'high_risk']
+
+
+def _risk_counts(scores: pd.Series) -> Dict[str, int]:
+    """Count scores per risk band in a single pass."""
+    counts = pd.cut(scores, bins=RISK_BINS, labels=RISK_LABELS, right=False).value_counts()
+    return {label: int(counts[label]) for label in RISK_LABELS}
+
+
+def _sample_preview(df: pd.DataFrame, n: int = 3, max_cell_chars: int = 256) -> List[Dict[str, str]]:
+    """First n rows of df as records of strings, each cell truncated to max_cell_chars characters."""
+    if df.empty:
+        return []
+    head = df.head(n).astype(str)
+    return head.apply(lambda col: col.str.slice(0, max_cell_chars)).to_dict(orient='records')
+
+
+def _bucket(agent_scores: Dict[str, float]):
+    """
+    Split one pharmacy's agent scores into high (>= 0.8) and low (< 0.4) risk agents.
+    
+    Returns:
+        tuple: (high_risk_agents, low_risk_agents, conflicting_signals)
+    """
+    names = np.array(list(agent_scores.keys()), dtype=object)
+    scores = np.fromiter(agent_scores.values(), dtype=np.float64, count=len(agent_scores))
+    high_risk_agents = names[scores >= 0.8].tolist()
+    low_risk_agents = names[scores < 0.4].tolist()
+    return high_risk_agents, low_risk_agents, bool(high_risk_agents) and bool(low_risk_agents)
+
 
 class LangSmithTracker:
     def __init__(self, project_name: str = "fraud-detection-system"):
-        """Initialize LangSmith tracking."""
+        """
+        Initialize LangSmith tracking.
+        
+        When enabled, the tracker makes network calls: the pipeline run and all
+        of its child runs are posted to LangSmith when end_project_run() is called.
+        """
         self.project_name = project_name
-        self.client = Client()
+        # Without an API key, or with tracing switched off, every track_* call is a no-op
+        api_key = os.getenv('LANGSMITH_API_KEY') or os.getenv('LANGCHAIN_API_KEY')
+        tracing = os.getenv('LANGSMITH_TRACING', os.getenv('LANGCHAIN_TRACING_V2', ''))
+        self.enabled = bool(api_key) and tracing.lower() != 'false'
         self.current_run_tree = None
         self.agent_runs = {}
         
+        # Child runs of the current pipeline run; sent together with it in one batch
+        self._pending_children: List[RunTree] = []
+        
         # Set up logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
+    @cached_property
+    def client(self) -> Client:
+        """LangSmith client, created on first use."""
+        return Client()
+    
     def start_project_run(self, description: str = "Fraud Detection Pipeline") -> str:
         """Start a new project run."""
+        if not self.enabled:
+            return None
+        
         try:
             self.current_run_tree = RunTree(
                 name="fraud-detection-pipeline",
@@ -28,6 +81,7 @@ class LangSmithTracker:
                 project_name=self.project_name,
                 tags=["fraud-detection", "parallel-agents", "supervisor"]
             )
+            self._pending_children = []
             self.logger.info(f"🚀 Started LangSmith project run: {self.current_run_tree.id}")
             return self.current_run_tree.id
         except Exception as e:
@@ -37,21 +91,26 @@ class LangSmithTracker:
     def track_agent_run(self, agent_name: str, input_data: Dict[str, Any], 
                        output_data: Dict[str, Any]) -> str:
         """Track an individual agent run."""
+        if not self.enabled:
+            return None
+        
         try:
             if not self.current_run_tree:
                 self.start_project_run()
             
             run_id = f"{agent_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
-            # Create agent run
+            # Create agent run; it is sent with the pipeline run
             agent_run = self.current_run_tree.create_child(
                 name=f"{agent_name}-execution",
                 inputs=input_data,
                 outputs=output_data,
                 tags=[agent_name, "agent-execution"]
             )
+            agent_run.end(outputs=output_data)
             
             self.agent_runs[agent_name] = agent_run
+            self._pending_children.append(agent_run)
             self.logger.info(f"📊 Tracked {agent_name} run: {agent_run.id}")
             return agent_run.id
             
@@ -63,29 +122,33 @@ class LangSmithTracker:
                                 weighted_results: pd.DataFrame, 
                                 insights: Dict[str, Any]) -> str:
         """Track supervisor analysis and cross-agent communication."""
+        if not self.enabled:
+            return None
+        
         try:
             if not self.current_run_tree:
                 self.start_project_run()
             
+            scores = weighted_results['weighted_score']
+            risk_counts = _risk_counts(scores)
+            score_stats = scores.agg(['mean', 'std'])
+            
             # Prepare supervisor inputs
             supervisor_inputs = {
                 "agent_results_summary": {
                     agent: {
                         "findings_count": len(results_df),
                         "columns": list(results_df.columns) if not results_df.empty else [],
-                        "sample_data": results_df.head(3).to_dict() if not results_df.empty else {}
+                        "sample_data": _sample_preview(results_df)
                     }
                     for agent, results_df in agent_results.items()
                 },
                 "total_pharmacies": len(weighted_results),
                 "weighted_results_summary": {
-                    "high_risk_count": len(weighted_results[weighted_results['weighted_score'] >= 0.8]),
-                    "medium_risk_count": len(weighted_results[
-                        (weighted_results['weighted_score'] >= 0.6) & 
-                        (weighted_results['weighted_score'] < 0.8)
-                    ]),
-                    "avg_score": weighted_results['weighted_score'].mean(),
-                    "score_std": weighted_results['weighted_score'].std()
+                    "high_risk_count": risk_counts['high_risk'],
+                    "medium_risk_count": risk_counts['medium_risk'],
+                    "avg_score": score_stats['mean'],
+                    "score_std": score_stats['std']
                 }
             }
             
@@ -101,6 +164,8 @@ class LangSmithTracker:
                 },
                 tags=["supervisor", "cross-agent-analysis", "consistency-checking"]
             )
+            supervisor_run.end()
+            self._pending_children.append(supervisor_run)
             
             self.logger.info(f"👨‍💼 Tracked supervisor analysis: {supervisor_run.id}")
             return supervisor_run.id
@@ -113,26 +178,21 @@ class LangSmithTracker:
                              weighted_results: pd.DataFrame, 
                              weights: Dict[str, float]) -> str:
         """Track weighted scoring process."""
+        if not self.enabled:
+            return None
+        
         try:
             if not self.current_run_tree:
                 self.start_project_run()
             
+            scores = weighted_results['weighted_score']
+            score_stats = scores.agg(['min', 'max', 'mean'])
+            
             # Calculate scoring metrics
             scoring_metrics = {
                 "weights_used": weights,
                 "total_pharmacies": len(weighted_results),
-                "score_distribution": {
-                    "high_risk": len(weighted_results[weighted_results['weighted_score'] >= 0.8]),
-                    "medium_risk": len(weighted_results[
-                        (weighted_results['weighted_score'] >= 0.6) & 
-                        (weighted_results['weighted_score'] < 0.8)
-                    ]),
-                    "low_risk": len(weighted_results[
-                        (weighted_results['weighted_score'] >= 0.4) & 
-                        (weighted_results['weighted_score'] < 0.6)
-                    ]),
-                    "very_low_risk": len(weighted_results[weighted_results['weighted_score'] < 0.4])
-                },
+                "score_distribution": _risk_counts(scores),
                 "agent_contributions": {
                     agent: {
                         "findings_count": len(results_df),
@@ -152,13 +212,15 @@ class LangSmithTracker:
                 outputs={
                     "weighted_results_summary": {
                         "total_pharmacies": len(weighted_results),
-                        "score_range": [weighted_results['weighted_score'].min(), weighted_results['weighted_score'].max()],
-                        "avg_score": weighted_results['weighted_score'].mean()
+                        "score_range": [score_stats['min'], score_stats['max']],
+                        "avg_score": score_stats['mean']
                     },
                     "scoring_metrics": scoring_metrics
                 },
                 tags=["weighted-scoring", "score-aggregation", "multi-agent"]
             )
+            scoring_run.end()
+            self._pending_children.append(scoring_run)
             
             self.logger.info(f"⚖️ Tracked weighted scoring: {scoring_run.id}")
             return scoring_run.id
@@ -172,48 +234,80 @@ class LangSmithTracker:
                                       consistency_score: float,
                                       outlier_score: float) -> str:
         """Track cross-agent communication for a specific pharmacy."""
+        run_ids = self.track_cross_agent_communication_batch([{
+            "pharmacy_number": pharmacy_number,
+            "agent_scores": agent_scores,
+            "consistency_score": consistency_score,
+            "outlier_score": outlier_score
+        }])
+        return run_ids[0] if run_ids else None
+    
+    def track_cross_agent_communication_batch(self, communications: List[Dict[str, Any]]) -> List[str]:
+        """
+        Track cross-agent communication for many pharmacies in one call.
+        
+        Args:
+            communications (List[Dict[str, Any]]): One entry per pharmacy with ``pharmacy_number``,
+                ``agent_scores``, ``consistency_score`` and ``outlier_score``
+                
+        Returns:
+            List[str]: Run IDs of the tracked communications
+        """
+        if not self.enabled or not communications:
+            return []
+        
         try:
             if not self.current_run_tree:
                 self.start_project_run()
             
-            # Analyze cross-agent patterns
-            high_risk_agents = [agent for agent, score in agent_scores.items() if score >= 0.8]
-            low_risk_agents = [agent for agent, score in agent_scores.items() if score < 0.4]
-            conflicting_signals = len(high_risk_agents) > 0 and len(low_risk_agents) > 0
-            
-            communication_analysis = {
-                "pharmacy_number": pharmacy_number,
-                "agent_scores": agent_scores,
-                "consistency_score": consistency_score,
-                "outlier_score": outlier_score,
-                "cross_agent_patterns": {
-                    "high_risk_agents": high_risk_agents,
-                    "low_risk_agents": low_risk_agents,
-                    "conflicting_signals": conflicting_signals,
-                    "agent_agreement": "high" if consistency_score >= 0.8 else "medium" if consistency_score >= 0.6 else "low"
-                }
-            }
-            
-            # Create cross-agent communication run
-            communication_run = self.current_run_tree.create_child(
-                name="cross-agent-communication",
-                inputs={
+            run_ids = []
+            for communication in communications:
+                pharmacy_number = communication["pharmacy_number"]
+                agent_scores = communication["agent_scores"]
+                consistency_score = communication["consistency_score"]
+                
+                # Analyze cross-agent patterns
+                high_risk_agents, low_risk_agents, conflicting_signals = _bucket(agent_scores)
+                
+                communication_analysis = {
                     "pharmacy_number": pharmacy_number,
-                    "agent_scores": agent_scores
-                },
-                outputs=communication_analysis,
-                tags=["cross-agent", "consistency-checking", "pharmacy-analysis"]
-            )
+                    "agent_scores": agent_scores,
+                    "consistency_score": consistency_score,
+                    "outlier_score": communication["outlier_score"],
+                    "cross_agent_patterns": {
+                        "high_risk_agents": high_risk_agents,
+                        "low_risk_agents": low_risk_agents,
+                        "conflicting_signals": conflicting_signals,
+                        "agent_agreement": "high" if consistency_score >= 0.8 else "medium" if consistency_score >= 0.6 else "low"
+                    }
+                }
+                
+                # Create cross-agent communication run
+                communication_run = self.current_run_tree.create_child(
+                    name="cross-agent-communication",
+                    inputs={
+                        "pharmacy_number": pharmacy_number,
+                        "agent_scores": agent_scores
+                    },
+                    outputs=communication_analysis,
+                    tags=["cross-agent", "consistency-checking", "pharmacy-analysis"]
+                )
+                communication_run.end()
+                self._pending_children.append(communication_run)
+                run_ids.append(communication_run.id)
             
-            self.logger.info(f"🔗 Tracked cross-agent communication for {pharmacy_number}: {communication_run.id}")
-            return communication_run.id
+            self.logger.info(f"🔗 Tracked cross-agent communication for {len(run_ids)} pharmacies")
+            return run_ids
             
         except Exception as e:
             self.logger.error(f"❌ Error tracking cross-agent communication: {e}")
-            return None
+            return []
     
     def end_project_run(self, final_results: Dict[str, Any] = None):
-        """End the project run and finalize tracking."""
+        """End the project run and send it, with all of its child runs, to LangSmith."""
+        if not self.enabled:
+            return None
+        
         try:
             if self.current_run_tree:
                 if final_results:
@@ -223,12 +317,42 @@ class LangSmithTracker:
                 else:
                     self.current_run_tree.end()
                 
+                self._flush()
+                
                 self.logger.info(f"✅ Completed LangSmith project run: {self.current_run_tree.id}")
                 self.logger.info(f"📊 View run at: https://smith.langchain.com/runs/{self.current_run_tree.id}")
                 
         except Exception as e:
             self.logger.error(f"❌ Error ending LangSmith run: {e}")
     
+    @staticmethod
+    def _run_payload(run: RunTree) -> Dict[str, Any]:
+        """Run fields for batch ingestion."""
+        return {
+            "id": run.id,
+            "trace_id": run.trace_id,
+            "dotted_order": run.dotted_order,
+            "parent_run_id": run.parent_run_id,
+            "name": run.name,
+            "run_type": run.run_type,
+            "inputs": run.inputs,
+            "outputs": run.outputs,
+            "start_time": run.start_time,
+            "end_time": run.end_time,
+            "tags": run.tags,
+            "session_name": run.session_name,
+        }
+    
+    def _flush(self):
+        """Send the pipeline run and its pending child runs to LangSmith in one batch, root run first."""
+        pending, self._pending_children = self._pending_children, []
+        runs = [self.current_run_tree] + pending
+        try:
+            self.client.batch_ingest_runs(create=[self._run_payload(run) for run in runs])
+            self.logger.info(f"📤 Sent {len(runs)} runs to LangSmith")
+        except Exception as e:
+            self.logger.error(f"❌ Error sending runs to LangSmith: {e}")
+    
     def get_run_url(self) -> str:
         """Get the URL for the current run."""
         if self.current_run_tree:
@@ -236,5 +360,12 @@ class LangSmithTracker:
         return "No active run"
 
 
-# Global tracker instance
-langsmith_tracker = LangSmithTracker() 
\ No newline at end of file
+_tracker = None
+
+
+def get_tracker() -> LangSmithTracker:
+    """Return the shared tracker, creating it on first use."""
+    global _tracker
+    if _tracker is None:
+        _tracker = LangSmithTracker()
+    return _tracker 
\ No newline at end of file
@@ -1,17 +1,102 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Union
+import atexit
 import concurrent.futures
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
 from agents.coverage_agent import CoverageTypeAgent
 from agents.patient_flip_agent_enhanced import PatientFlipAgentEnhanced
 from agents.high_dollar_agent import HighDollarClaimAgent
 from agents.rejected_claim_agent import RejectedClaimDensityAgent
 from agents.network_anomaly_agent import PharmacyNetworkAnomalyAgent
 from utils.db_loader import AzureSynapseLoader
-from utils.langsmith_integration import langsmith_tracker
+from utils.langsmith_integration import get_tracker
+
+# Low-cardinality string columns the agents group and filter on
+CATEGORY_COLUMNS = ['pharmacy_number', 'coverage_type', 'pharmacy_state', 'pharmacy_city']
+
+# Smoothing factor for the moving average of measured agent run times
+AGENT_COST_SMOOTHING = 0.3
+
+# Fixed column order of the pharmacy x agent score matrix
+AGENT_ORDER = ['coverage_agent', 'patient_flip_agent', 'high_dollar_agent', 'rejection_agent', 'network_agent']
+
+
+def build_score_matrix(agent_results: Dict[str, pd.DataFrame]) -> Tuple[pd.Index, List[str], np.ndarray, np.ndarray]:
+    """
+    Pivot agent findings into pharmacy x agent score and reason arrays.
+    
+    Where an agent reports several rows for a pharmacy, the first one counts.
+    
+    Args:
+        agent_results (Dict[str, pd.DataFrame]): Results from each agent
+        
+    Returns:
+        Tuple[pd.Index, List[str], np.ndarray, np.ndarray]: Pharmacy numbers (rows), agent names
+        (columns, ``AGENT_ORDER`` first), fraud scores (NaN where an agent has no finding) and reasons
+    """
+    agent_firsts = {
+        agent_name: results_df.drop_duplicates('pharmacy_number').set_index('pharmacy_number')
+        for agent_name, results_df in agent_results.items()
+        if not results_df.empty and 'pharmacy_number' in results_df.columns
+    }
+    agent_names = AGENT_ORDER + [name for name in agent_firsts if name not in AGENT_ORDER]
+    
+    if not agent_firsts:
+        return pd.Index([]), agent_names, np.empty((0, len(agent_names))), np.empty((0, len(agent_names)), dtype=object)
+    
+    score_wide = pd.concat(
+        {name: firsts['fraud_score'] for name, firsts in agent_firsts.items()}, axis=1
+    ).reindex(columns=agent_names)
+    reason_wide = pd.concat(
+        {name: firsts['reason'] for name, firsts in agent_firsts.items()}, axis=1
+    ).reindex(index=score_wide.index, columns=agent_names)
+    
+    return score_wide.index, agent_names, score_wide.to_numpy(dtype=float), reason_wide.to_numpy(dtype=object)
+
+
+def _run_single_agent(agent_name: str, agent, df: pd.DataFrame) -> pd.DataFrame:
+    """Run a single agent with error handling."""
+    try:
+        if agent_name == 'network_agent':
+            # Network agent needs combined results from other agents
+            return agent.run(df, pd.DataFrame())  # Will be enhanced later
+        else:
+            return agent.run(df)
+    except Exception as e:
+        print(f"❌ Error running {agent_name}: {e}")
+        return pd.DataFrame()
+
+
+def _run_single_agent_worker(agent_name: str, agent, data: Union[str, pd.DataFrame]) -> Tuple[pd.DataFrame, float]:
+    """
+    Process pool entry point for a single agent.
+    
+    Args:
+        agent_name (str): Name of the agent
+        agent: Agent instance
+        data (str or pd.DataFrame): Path to the shared Feather snapshot of the input data, or the data itself
+        
+    Returns:
+        Tuple[pd.DataFrame, float]: Agent findings (empty on error) and the run time in seconds
+    """
+    start = time.perf_counter()
+    if isinstance(data, str):
+        data = pd.read_feather(data)
+    findings = _run_single_agent(agent_name, agent, data)
+    return findings, time.perf_counter() - start
 
 
 class WeightedScoringSystem:
+    # Agent worker processes shared by every scoring system, started on first use
+    _pool = None
+    _pool_lock = threading.Lock()
+    
     def __init__(self):
         self.default_weights = {
             'coverage_agent': 0.25,
@@ -21,6 +106,8 @@ class WeightedScoringSystem:
             'network_agent': 0.15
         }
         self.current_weights = self.default_weights.copy()
+        # Weights aligned with the AGENT_ORDER score matrix columns, rebuilt whenever the weights change
+        self._w_vec = self._build_weight_vector()
         self.agents = {
             'coverage_agent': CoverageTypeAgent(),
             'patient_flip_agent': PatientFlipAgentEnhanced(),
@@ -28,6 +115,18 @@ class WeightedScoringSystem:
             'rejection_agent': RejectedClaimDensityAgent(),
             'network_agent': PharmacyNetworkAnomalyAgent()
         }
+        # Estimated run time per agent in seconds, refined from measured runs
+        self._agent_cost = {
+            'coverage_agent': 3.0,
+            'patient_flip_agent': 3.0,
+            'network_agent': 2.0,
+            'rejection_agent': 1.0,
+            'high_dollar_agent': 1.0
+        }
+        # Pharmacy x agent score matrix of the latest scoring run (see build_score_matrix)
+        self._pharmacy_index = pd.Index([])
+        self._scores_mat = np.empty((0, len(AGENT_ORDER)))
+        self._reasons_mat = np.empty((0, len(AGENT_ORDER)), dtype=object)
     
     def update_weights(self, new_weights: Dict[str, float]):
         """Update agent weights from UI."""
@@ -36,30 +135,38 @@ class WeightedScoringSystem:
         total = sum(self.current_weights.values())
         if total > 0:
             self.current_weights = {k: v/total for k, v in self.current_weights.items()}
+        self._w_vec = self._build_weight_vector()
+    
+    def _build_weight_vector(self) -> np.ndarray:
+        """Current weights as an array in ``AGENT_ORDER``."""
+        return np.array([self.current_weights.get(agent_name, 0.0) for agent_name in AGENT_ORDER])
     
     def run_agents_parallel(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         """Execute all agents in parallel."""
         print("🚀 Running agents in parallel...")
         
         # Start LangSmith tracking
-        langsmith_tracker.start_project_run("Parallel Fraud Detection with Supervisor")
+        get_tracker().start_project_run("Parallel Fraud Detection with Supervisor")
         
+        df = self._categorize(df)
         results = {}
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_agent = {
-                executor.submit(self._run_single_agent, agent_name, agent, df): agent_name 
-                for agent_name, agent in self.agents.items()
-            }
+        # Longest-running agents first so a slow agent does not start last
+        agents_by_cost = sorted(self.agents.items(), key=lambda item: -self._agent_cost.get(item[0], 1.0))
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shared_data = self._share_data(df, tmp_dir)
+            pool, future_to_agent = self._submit_agents(agents_by_cost, shared_data)
             
             for future in concurrent.futures.as_completed(future_to_agent):
                 agent_name = future_to_agent[future]
                 try:
-                    agent_results = future.result()
+                    agent_results, elapsed = future.result()
                     results[agent_name] = agent_results
+                    self._update_agent_cost(agent_name, elapsed)
                     
                     # Track agent run in LangSmith
-                    langsmith_tracker.track_agent_run(
+                    get_tracker().track_agent_run(
                         agent_name=agent_name,
                         input_data={"data_shape": df.shape, "columns": list(df.columns)},
                         output_data={
@@ -73,196 +180,317 @@ class WeightedScoringSystem:
                 except Exception as e:
                     print(f"❌ Error in {agent_name}: {e}")
                     results[agent_name] = pd.DataFrame()
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died; start a fresh pool on the next run
+                        self._discard_pool(pool)
         
         return results
     
-    def _run_single_agent(self, agent_name: str, agent, df: pd.DataFrame) -> pd.DataFrame:
-        """Run a single agent with error handling."""
+    def _submit_agents(self, agents: List[Tuple[str, Any]],
+                       shared_data: Union[str, pd.DataFrame]) -> Tuple[concurrent.futures.ProcessPoolExecutor, Dict[Any, str]]:
+        """
+        Submit each agent to the shared process pool.
+        
+        Args:
+            agents (List[Tuple[str, Any]]): Agent names and instances, in submission order
+            shared_data (str or pd.DataFrame): Input data as returned by ``_share_data``
+            
+        Returns:
+            Tuple[ProcessPoolExecutor, Dict[Any, str]]: The pool the agents run on, and future to agent name
+        """
+        def submit_all(executor):
+            return {
+                executor.submit(_run_single_agent_worker, agent_name, agent, shared_data): agent_name
+                for agent_name, agent in agents
+            }
+        
+        pool = self._get_pool()
         try:
-            if agent_name == 'network_agent':
-                # Network agent needs combined results from other agents
-                return agent.run(df, pd.DataFrame())  # Will be enhanced later
-            else:
-                return agent.run(df)
+            return pool, submit_all(pool)
+        except RuntimeError:
+            # The pool broke (BrokenProcessPool) or another run just discarded it; retry once on a fresh pool
+            self._discard_pool(pool)
+            pool = self._get_pool()
+            return pool, submit_all(pool)
+    
+    @classmethod
+    def _get_pool(cls) -> concurrent.futures.ProcessPoolExecutor:
+        """Shared agent process pool, created on first use and shut down at interpreter exit."""
+        with cls._pool_lock:
+            if cls._pool is None:
+                # The pool may be started from a threaded process (Streamlit), where forking is unsafe
+                cls._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(len(AGENT_ORDER), os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                atexit.register(cls.close)
+            return cls._pool
+    
+    @classmethod
+    def _discard_pool(cls, pool: concurrent.futures.ProcessPoolExecutor):
+        """Stop sharing a broken pool; a replacement another run already started is left alone."""
+        with cls._pool_lock:
+            if cls._pool is pool:
+                cls._pool = None
+                atexit.unregister(cls.close)
+        pool.shutdown(wait=False)
+    
+    @classmethod
+    def close(cls):
+        """Shut down the shared agent process pool."""
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.shutdown()
+                cls._pool = None
+                atexit.unregister(cls.close)
+    
+    def _update_agent_cost(self, agent_name: str, elapsed: float):
+        """Blend a measured agent run time into its estimated cost."""
+        previous = self._agent_cost.get(agent_name, elapsed)
+        self._agent_cost[agent_name] = (1 - AGENT_COST_SMOOTHING) * previous + AGENT_COST_SMOOTHING * elapsed
+    
+    def _categorize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Shallow copy of ``df`` with the ``CATEGORY_COLUMNS`` present converted to ``category`` dtype."""
+        df = df.copy(deep=False)
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+    
+    def _share_data(self, df: pd.DataFrame, tmp_dir: str) -> Union[str, pd.DataFrame]:
+        """
+        Write ``df`` once to an uncompressed Feather file the agent processes read back.
+        
+        Args:
+            df (pd.DataFrame): Input data for the agents
+            tmp_dir (str): Directory for the snapshot
+            
+        Returns:
+            str or pd.DataFrame: Snapshot path, or ``df`` itself if it cannot be written as Feather
+        """
+        data_path = os.path.join(tmp_dir, 'agent_input.feather')
+        try:
+            df.reset_index(drop=True).to_feather(data_path, compression='uncompressed')
+            return data_path
         except Exception as e:
-            print(f"❌ Error running {agent_name}: {e}")
-            return pd.DataFrame()
+            print(f"⚠️ Could not write shared agent input ({e}), sending data to each agent process")
+            return df
     
     def calculate_weighted_scores(self, agent_results: Dict[str, pd.DataFrame], df: pd.DataFrame) -> pd.DataFrame:
         """Calculate weighted scores for all pharmacies."""
         print("⚖️ Calculating weighted scores...")
         
-        # Get all unique pharmacies from all agents
-        all_pharmacies = set()
-        for results_df in agent_results.values():
-            if not results_df.empty and 'pharmacy_number' in results_df.columns:
-                all_pharmacies.update(results_df['pharmacy_number'].unique())
-        
-        weighted_results = []
-        
-        for pharmacy_number in all_pharmacies:
-            pharmacy_result = self._calculate_single_pharmacy_score(
-                pharmacy_number, agent_results, df
+        # Pharmacy x agent scores and reasons, kept for later passes over the same run
+        pharmacy_index, agent_names, scores_mat, reasons_mat = build_score_matrix(agent_results)
+        self._pharmacy_index, self._scores_mat, self._reasons_mat = pharmacy_index, scores_mat, reasons_mat
+        
+        if len(pharmacy_index):
+            # Missing agents contribute nothing; agents outside AGENT_ORDER are weighted by name
+            weights = self._w_vec
+            if len(agent_names) > len(AGENT_ORDER):
+                extra_weights = [self.current_weights.get(agent_name, 0.0) for agent_name in agent_names[len(AGENT_ORDER):]]
+                weights = np.concatenate([weights, extra_weights])
+            weighted_scores = np.nan_to_num(scores_mat) @ weights
+            consistency_scores = self._calculate_consistency_scores(scores_mat)
+            outlier_scores = self._calculate_outlier_scores(scores_mat, agent_results)
+            
+            # Final aggregated score
+            final_scores = (weighted_scores * 0.7) + (consistency_scores * 0.2) + (outlier_scores * 0.1)
+            
+            # Per-pharmacy dicts of the agents that flagged each pharmacy
+            present = ~np.isnan(scores_mat)
+            agent_scores = [
+                {agent_names[j]: scores_mat[i, j] for j in np.flatnonzero(present[i])} for i in range(len(scores_mat))
+            ]
+            agent_reasons = [
+                {agent_names[j]: reasons_mat[i, j] for j in np.flatnonzero(present[i])} for i in range(len(reasons_mat))
+            ]
+            
+            # Pharmacy name and location come from the coverage agent
+            detail_columns = ['pharmacy_name', 'pharmacy_city', 'pharmacy_state']
+            coverage = agent_results.get('coverage_agent', pd.DataFrame())
+            if not coverage.empty and 'pharmacy_number' in coverage.columns:
+                details = coverage.drop_duplicates('pharmacy_number').set_index('pharmacy_number')
+                details = details.reindex(index=pharmacy_index, columns=detail_columns)
+            else:
+                details = pd.DataFrame(index=pharmacy_index, columns=detail_columns)
+            details = details.astype(object).where(details.notna(), 'Unknown')
+            
+            # Claim counts per pharmacy from one pass over the transactions
+            transaction_counts = (
+                self._summarize_transactions(df).reindex(pharmacy_index, fill_value=0).to_numpy()
             )
-            weighted_results.append(pharmacy_result)
-        
-        weighted_df = pd.DataFrame(weighted_results)
-        
-        # Track weighted scoring in LangSmith
-        langsmith_tracker.track_weighted_scoring(
-            agent_results=agent_results,
-            weighted_results=weighted_df,
-            weights=self.current_weights
-        )
+            
+            fraud_explanations = [
+                self._generate_fraud_explanation(scores_mat[i], reasons_mat[i], transaction_counts[i])
+                for i in range(len(pharmacy_index))
+            ]
+            
+            weighted_df = pd.DataFrame({
+                'pharmacy_number': pharmacy_index.to_numpy(),
+                'pharmacy_name': details['pharmacy_name'].to_numpy(),
+                'pharmacy_city': details['pharmacy_city'].to_numpy(),
+                'pharmacy_state': details['pharmacy_state'].to_numpy(),
+                'weighted_score': np.round(final_scores, 3),
+                'contributing_agents': [list(pharmacy_scores) for pharmacy_scores in agent_scores],
+                'agent_scores': agent_scores,
+                'agent_reasons': agent_reasons,
+                'consistency_score': np.round(consistency_scores, 3),
+                'outlier_score': np.round(outlier_scores, 3),
+                'fraud_explanation': fraud_explanations,
+                'transaction_count': transaction_counts[:, 0],
+                'risk_level': self._determine_risk_levels(final_scores)
+            })
+            
+            # Track cross-agent communication and weighted scoring in LangSmith, once per run
+            tracker = get_tracker()
+            if tracker.enabled:
+                tracker.track_cross_agent_communication_batch([
+                    {
+                        'pharmacy_number': pharmacy_number,
+                        'agent_scores': agent_scores[i],
+                        'consistency_score': consistency_scores[i],
+                        'outlier_score': outlier_scores[i]
+                    }
+                    for i, pharmacy_number in enumerate(pharmacy_index)
+                ])
+                tracker.track_weighted_scoring(
+                    agent_results=agent_results,
+                    weighted_results=weighted_df,
+                    weights=self.current_weights
+                )
+        else:
+            weighted_df = pd.DataFrame()
         
         return weighted_df
     
-    def _calculate_single_pharmacy_score(self, pharmacy_number: str, agent_results: Dict[str, pd.DataFrame], df: pd.DataFrame) -> Dict[str, Any]:
-        """Calculate weighted score for a single pharmacy."""
-        pharmacy_scores = {}
-        pharmacy_reasons = {}
-        pharmacy_details = {}
+    def _calculate_consistency_scores(self, scores_mat: np.ndarray) -> np.ndarray:
+        """
+        Calculate consistency across agents for every pharmacy (prevent double-penalizing).
         
-        # Collect scores and reasons from each agent
-        for agent_name, results_df in agent_results.items():
-            if not results_df.empty and 'pharmacy_number' in results_df.columns:
-                pharmacy_data = results_df[results_df['pharmacy_number'] == pharmacy_number]
-                if not pharmacy_data.empty:
-                    pharmacy_scores[agent_name] = pharmacy_data['fraud_score'].iloc[0]
-                    pharmacy_reasons[agent_name] = pharmacy_data['reason'].iloc[0]
-                    pharmacy_details[agent_name] = pharmacy_data.iloc[0].to_dict()
-        
-        # Calculate weighted score
-        weighted_score = 0.0
-        contributing_agents = []
-        
-        for agent_name, score in pharmacy_scores.items():
-            weight = self.current_weights.get(agent_name, 0.0)
-            weighted_score += score * weight
-            contributing_agents.append(agent_name)
-        
-        # Cross-agent consistency check
-        consistency_score = self._calculate_consistency_score(pharmacy_scores)
-        
-        # Outlier detection
-        outlier_score = self._calculate_outlier_score(pharmacy_number, agent_results)
-        
-        # Track cross-agent communication for this pharmacy
-        langsmith_tracker.track_cross_agent_communication(
-            pharmacy_number=pharmacy_number,
-            agent_scores=pharmacy_scores,
-            consistency_score=consistency_score,
-            outlier_score=outlier_score
+        Args:
+            scores_mat (np.ndarray): Pharmacy x agent fraud scores (NaN where an agent has no finding)
+            
+        Returns:
+            np.ndarray: Consistency score per pharmacy, in ``scores_mat`` row order
+        """
+        present = ~np.isnan(scores_mat)
+        
+        # Check for conflicting signals (NaN compares False, so absent agents never count)
+        has_high = (scores_mat >= 0.8).any(axis=1)
+        has_low = (scores_mat < 0.4).any(axis=1)
+        
+        return np.select(
+            [
+                present.sum(axis=1) < 2,   # Neutral if only one agent
+                has_high & has_low,        # Inconsistent signals
+                has_high,                  # Consistent high risk
+                has_low                    # Consistent low risk
+            ],
+            [0.5, 0.3, 0.9, 0.1],
+            default=0.5                    # Mixed signals
         )
-        
-        # Final aggregated score
-        final_score = (weighted_score * 0.7) + (consistency_score * 0.2) + (outlier_score * 0.1)
-        
-        # Get pharmacy transactions
-        pharmacy_transactions = self._get_pharmacy_transactions(pharmacy_number, df)
-        
-        # Generate fraud explanation
-        fraud_explanation = self._generate_fraud_explanation(pharmacy_scores, pharmacy_reasons, pharmacy_transactions)
-        
-        return {
-            'pharmacy_number': pharmacy_number,
-            'pharmacy_name': pharmacy_details.get('coverage_agent', {}).get('pharmacy_name', 'Unknown'),
-            'pharmacy_city': pharmacy_details.get('coverage_agent', {}).get('pharmacy_city', 'Unknown'),
-            'pharmacy_state': pharmacy_details.get('coverage_agent', {}).get('pharmacy_state', 'Unknown'),
-            'weighted_score': round(final_score, 3),
-            'contributing_agents': contributing_agents,
-            'agent_scores': pharmacy_scores,
-            'agent_reasons': pharmacy_reasons,
-            'consistency_score': round(consistency_score, 3),
-            'outlier_score': round(outlier_score, 3),
-            'fraud_explanation': fraud_explanation,
-            'transaction_count': len(pharmacy_transactions),
-            'risk_level': self._determine_risk_level(final_score)
-        }
     
-    def _calculate_consistency_score(self, pharmacy_scores: Dict[str, float]) -> float:
-        """Calculate consistency across agents (prevent double-penalizing)."""
-        if len(pharmacy_scores) < 2:
-            return 0.5  # Neutral if only one agent
-        
-        # Check for conflicting signals
-        high_scores = [s for s in pharmacy_scores.values() if s >= 0.8]
-        low_scores = [s for s in pharmacy_scores.values() if s < 0.4]
-        
-        if high_scores and low_scores:
-            return 0.3  # Inconsistent signals
-        elif high_scores:
-            return 0.9  # Consistent high risk
-        elif low_scores:
-            return 0.1  # Consistent low risk
-        else:
-            return 0.5  # Mixed signals
-    
-    def _calculate_outlier_score(self, pharmacy_number: str, agent_results: Dict[str, pd.DataFrame]) -> float:
-        """Calculate outlier score using Z-scores."""
-        all_scores = []
-        
-        for agent_name, results_df in agent_results.items():
-            if not results_df.empty and 'fraud_score' in results_df.columns:
-                all_scores.extend(results_df['fraud_score'].tolist())
+    def _calculate_outlier_scores(self, scores_mat: np.ndarray, agent_results: Dict[str, pd.DataFrame]) -> np.ndarray:
+        """
+        Calculate outlier scores for every pharmacy using Z-scores.
         
+        Args:
+            scores_mat (np.ndarray): Pharmacy x agent fraud scores (NaN where an agent has no finding)
+            agent_results (Dict[str, pd.DataFrame]): Results from each agent
+            
+        Returns:
+            np.ndarray: Sigmoid of each pharmacy's average-score Z-score, in ``scores_mat`` row order
+        """
+        neutral = np.full(len(scores_mat), 0.5)
+        
+        # Mean and spread across every finding from every agent
+        all_scores = [
+            results_df['fraud_score'].to_numpy()
+            for results_df in agent_results.values()
+            if not results_df.empty and 'fraud_score' in results_df.columns
+        ]
         if not all_scores:
-            return 0.5
+            return neutral
         
+        all_scores = np.concatenate(all_scores)
         mean_score = np.mean(all_scores)
         std_score = np.std(all_scores)
         
         if std_score == 0:
-            return 0.5
+            return neutral
         
-        # Find this pharmacy's average score
-        pharmacy_scores = []
-        for agent_name, results_df in agent_results.items():
-            if not results_df.empty and 'pharmacy_number' in results_df.columns:
-                pharmacy_data = results_df[results_df['pharmacy_number'] == pharmacy_number]
-                if not pharmacy_data.empty:
-                    pharmacy_scores.append(pharmacy_data['fraud_score'].iloc[0])
+        # Each pharmacy's average over the agents that flagged it
+        avg_pharmacy_scores = np.nanmean(scores_mat, axis=1)
+        z_scores = (avg_pharmacy_scores - mean_score) / std_score
         
-        if not pharmacy_scores:
-            return 0.5
+        # Convert Z-scores to 0-1 scale
+        return 1 / (1 + np.exp(-z_scores))  # Sigmoid function
+    
+    def _summarize_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Count each pharmacy's claims with a single groupby over the transactions.
         
-        avg_pharmacy_score = np.mean(pharmacy_scores)
-        z_score = (avg_pharmacy_score - mean_score) / std_score
+        Args:
+            df (pd.DataFrame): Transaction data
+            
+        Returns:
+            pd.DataFrame: ``total_claims``, ``cash_claims`` and ``high_dollar_claims`` indexed by pharmacy_number
+        """
+        count_columns = ['total_claims', 'cash_claims', 'high_dollar_claims']
+        if 'pharmacy_number' not in df.columns:
+            return pd.DataFrame(columns=count_columns, dtype='int64')
+        
+        no_flags = pd.Series(False, index=df.index)
+        
+        # Boolean flags on a separate frame so the caller's df is left untouched
+        flags = pd.DataFrame({
+            'pharmacy_number': df['pharmacy_number'],
+            'cash_claims': (
+                df['coverage_type'].isin(['Cash', 'Not Covered'])
+                if 'coverage_type' in df.columns else no_flags
+            ),
+            'high_dollar_claims': (
+                (df['copay_cost'] > 200) | (df['oop_cost'] > 500)
+                if {'copay_cost', 'oop_cost'} <= set(df.columns) else no_flags
+            )
+        })
         
-        # Convert Z-score to 0-1 scale
-        outlier_score = 1 / (1 + np.exp(-z_score))  # Sigmoid function
-        return outlier_score
-    
-    def _get_pharmacy_transactions(self, pharmacy_number: str, df: pd.DataFrame) -> pd.DataFrame:
-        """Get all transactions for a specific pharmacy."""
-        if 'pharmacy_number' in df.columns:
-            pharmacy_transactions = df[df['pharmacy_number'] == pharmacy_number].copy()
-            return pharmacy_transactions
-        return pd.DataFrame()
+        grouped = flags.groupby('pharmacy_number', observed=True, sort=False)
+        summary = grouped[['cash_claims', 'high_dollar_claims']].sum()
+        summary.insert(0, 'total_claims', grouped.size())
+        return summary[count_columns]
     
-    def _generate_fraud_explanation(self, scores: Dict[str, float], reasons: Dict[str, str], transactions: pd.DataFrame) -> str:
-        """Generate detailed fraud explanation."""
-        high_risk_agents = [agent for agent, score in scores.items() if score >= 0.8]
-        medium_risk_agents = [agent for agent, score in scores.items() if 0.6 <= score < 0.8]
+    def _generate_fraud_explanation(self, scores_row: np.ndarray, reasons_row: np.ndarray,
+                                    transaction_counts: np.ndarray) -> str:
+        """
+        Generate detailed fraud explanation.
+        
+        Args:
+            scores_row (np.ndarray): The pharmacy's row of the wide score matrix (NaN where an agent has no finding)
+            reasons_row (np.ndarray): The matching row of agent reasons
+            transaction_counts (np.ndarray): Total, cash/not covered and high-dollar claim counts
+            
+        Returns:
+            str: Explanation text
+        """
+        # NaN compares False, so agents without a finding drop out of both masks
+        high_risk = scores_row >= 0.8
+        medium_risk = (scores_row >= 0.6) & (scores_row < 0.8)
+        total_claims, cash_claims, high_dollar_claims = transaction_counts
         
         explanation_parts = []
         
-        if high_risk_agents:
-            agent_reasons = [reasons.get(agent, "High risk") for agent in high_risk_agents]
-            explanation_parts.append(f"🚨 HIGH RISK from {len(high_risk_agents)} agents: {', '.join(agent_reasons)}")
+        if high_risk.any():
+            agent_reasons = [r if isinstance(r, str) else "High risk" for r in reasons_row[high_risk]]
+            explanation_parts.append(f"🚨 HIGH RISK from {len(agent_reasons)} agents: {', '.join(agent_reasons)}")
         
-        if medium_risk_agents:
-            agent_reasons = [reasons.get(agent, "Medium risk") for agent in medium_risk_agents]
-            explanation_parts.append(f"⚠️ MEDIUM RISK from {len(medium_risk_agents)} agents: {', '.join(agent_reasons)}")
+        if medium_risk.any():
+            agent_reasons = [r if isinstance(r, str) else "Medium risk" for r in reasons_row[medium_risk]]
+            explanation_parts.append(f"⚠️ MEDIUM RISK from {len(agent_reasons)} agents: {', '.join(agent_reasons)}")
         
         # Add transaction insights
-        if not transactions.empty:
-            total_claims = len(transactions)
-            cash_claims = len(transactions[transactions['coverage_type'].isin(['Cash', 'Not Covered'])])
-            high_dollar_claims = len(transactions[
-                (transactions['copay_cost'] > 200) | (transactions['oop_cost'] > 500)
-            ])
-            
+        if total_claims > 0:
             transaction_insights = []
             if cash_claims > 0:
                 cash_percent = (cash_claims / total_claims) * 100
@@ -279,34 +507,56 @@ class WeightedScoringSystem:
         
         return " | ".join(explanation_parts)
     
+    def _determine_risk_levels(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Determine risk levels for an array of weighted scores.
+        
+        Args:
+            scores (np.ndarray): Final weighted scores
+            
+        Returns:
+            np.ndarray: Risk level label per score
+        """
+        scores = np.asarray(scores)
+        return np.select(
+            [scores >= 0.8, scores >= 0.6, scores >= 0.4],
+            ["HIGH RISK", "MEDIUM RISK", "LOW RISK"],
+            default="VERY LOW RISK"
+        ).astype(object)
+    
     def _determine_risk_level(self, score: float) -> str:
         """Determine risk level based on weighted score."""
-        if score >= 0.8:
-            return "HIGH RISK"
-        elif score >= 0.6:
-            return "MEDIUM RISK"
-        elif score >= 0.4:
-            return "LOW RISK"
-        else:
-            return "VERY LOW RISK"
+        return self._determine_risk_levels(np.array([score]))[0]
 
 
 class SupervisorAgent:
     def __init__(self):
         self.scoring_system = WeightedScoringSystem()
     
-    def supervise_analysis(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def supervise_analysis(self, df: pd.DataFrame, agent_results: Dict[str, pd.DataFrame] = None) -> Dict[str, Any]:
         """Supervise the entire fraud detection process."""
         print("👨‍💼 Supervisor starting analysis...")
         
-        # Run agents in parallel
-        agent_results = self.scoring_system.run_agents_parallel(df)
+        # Run agents in parallel unless their results were already computed
+        if agent_results is None:
+            agent_results = self.scoring_system.run_agents_parallel(df)
         
         # Calculate weighted scores
         weighted_results = self.scoring_system.calculate_weighted_scores(agent_results, df)
         
-        # Generate supervisor insights
-        supervisor_insights = self._generate_supervisor_insights(weighted_results, agent_results)
+        # Generate supervisor insights; with nothing scored there is nothing to analyze or track
+        if weighted_results.empty:
+            print("⚠️ No pharmacies scored - skipping supervisor insights")
+            supervisor_insights = {
+                'total_pharmacies_analyzed': 0,
+                'high_risk_pharmacies': 0,
+                'medium_risk_pharmacies': 0,
+                'agent_performance': {},
+                'cross_agent_patterns': {},
+                'recommendations': []
+            }
+        else:
+            supervisor_insights = self._generate_supervisor_insights(weighted_results, agent_results)
         
         # End LangSmith tracking
         final_results = {
@@ -316,21 +566,21 @@ class SupervisorAgent:
             'scoring_system': self.scoring_system
         }
         
-        langsmith_tracker.end_project_run(final_results)
+        get_tracker().end_project_run(final_results)
         
         # Print LangSmith URL
-        print(f"📊 View detailed run at: {langsmith_tracker.get_run_url()}")
+        print(f"📊 View detailed run at: {get_tracker().get_run_url()}")
         
         return final_results
     
     def _generate_supervisor_insights(self, weighted_results: pd.DataFrame, agent_results: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """Generate supervisor insights and recommendations."""
+        # Count with boolean masks rather than materializing the filtered frames
+        final_scores = weighted_results['weighted_score'].to_numpy() if not weighted_results.empty else np.empty(0)
         insights = {
             'total_pharmacies_analyzed': len(weighted_results),
-            'high_risk_pharmacies': len(weighted_results[weighted_results['weighted_score'] >= 0.8]),
-            'medium_risk_pharmacies': len(weighted_results[
-                (weighted_results['weighted_score'] >= 0.6) & (weighted_results['weighted_score'] < 0.8)
-            ]),
+            'high_risk_pharmacies': int((final_scores >= 0.8).sum()),
+            'medium_risk_pharmacies': int(((final_scores >= 0.6) & (final_scores < 0.8)).sum()),
             'agent_performance': {},
             'cross_agent_patterns': {},
             'recommendations': []
@@ -340,15 +590,16 @@ class SupervisorAgent:
         for agent_name, results_df in agent_results.items():
             if not results_df.empty:
                 avg_score = results_df['fraud_score'].mean()
-                high_risk_count = len(results_df[results_df['fraud_score'] >= 0.8])
+                high_risk_count = int((results_df['fraud_score'] >= 0.8).sum())
                 insights['agent_performance'][agent_name] = {
                     'avg_score': round(avg_score, 3),
                     'high_risk_findings': high_risk_count,
                     'total_findings': len(results_df)
                 }
         
-        # Analyze cross-agent patterns
-        cross_agent_analysis = self._analyze_cross_agent_patterns(weighted_results, agent_results)
+        # Analyze cross-agent patterns on the pharmacy x agent score matrix
+        _, agent_names, scores_mat, _ = build_score_matrix(agent_results)
+        cross_agent_analysis = self._analyze_cross_agent_patterns(scores_mat, agent_names)
         insights['cross_agent_patterns'] = cross_agent_analysis
         
         # Generate recommendations
@@ -366,7 +617,7 @@ class SupervisorAgent:
             insights['recommendations'].append("High agent agreement detected - consider increasing confidence threshold")
         
         # Track supervisor analysis in LangSmith
-        langsmith_tracker.track_supervisor_analysis(
+        get_tracker().track_supervisor_analysis(
             agent_results=agent_results,
             weighted_results=weighted_results,
             insights=insights
@@ -374,34 +625,31 @@ class SupervisorAgent:
         
         return insights
     
-    def _analyze_cross_agent_patterns(self, weighted_results: pd.DataFrame, agent_results: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
-        """Analyze patterns across agents for supervisor insights."""
-        patterns = {
-            'conflicting_signals_count': 0,
-            'high_consistency_count': 0,
-            'agent_agreement_analysis': {},
-            'double_penalty_instances': 0
-        }
+    def _analyze_cross_agent_patterns(self, scores_mat: np.ndarray, agent_names: List[str]) -> Dict[str, Any]:
+        """
+        Analyze patterns across agents for supervisor insights.
         
-        # Analyze each pharmacy for cross-agent patterns
-        for _, row in weighted_results.iterrows():
-            pharmacy_number = row['pharmacy_number']
-            agent_scores = row.get('agent_scores', {})
+        Args:
+            scores_mat (np.ndarray): Pharmacy x agent fraud scores (NaN where an agent has no finding)
+            agent_names (List[str]): Agent name of each ``scores_mat`` column
             
-            if agent_scores:
-                high_risk_agents = [agent for agent, score in agent_scores.items() if score >= 0.8]
-                low_risk_agents = [agent for agent, score in agent_scores.items() if score < 0.4]
-                
-                # Check for conflicting signals
-                if high_risk_agents and low_risk_agents:
-                    patterns['conflicting_signals_count'] += 1
-                
-                # Check for high consistency
-                if len(high_risk_agents) >= 3 or len(low_risk_agents) >= 3:
-                    patterns['high_consistency_count'] += 1
-                
-                # Check for double penalty (same pattern flagged by multiple agents)
-                if 'coverage_agent' in high_risk_agents and 'patient_flip_agent' in high_risk_agents:
-                    patterns['double_penalty_instances'] += 1
-        
-        return patterns 
\ No newline at end of file
+        Returns:
+            Dict[str, Any]: Pattern counts across pharmacies
+        """
+        # NaN compares False, so agents without a finding count as neither high nor low
+        high_risk = scores_mat >= 0.8
+        low_risk = scores_mat < 0.4
+        high_risk_counts = high_risk.sum(axis=1)
+        low_risk_counts = low_risk.sum(axis=1)
+        
+        # Double penalty: the same pattern flagged high by both the coverage and patient flip agents
+        double_penalty = (
+            high_risk[:, agent_names.index('coverage_agent')] & high_risk[:, agent_names.index('patient_flip_agent')]
+        )
+        
+        return {
+            'conflicting_signals_count': int(((high_risk_counts > 0) & (low_risk_counts > 0)).sum()),
+            'high_consistency_count': int(((high_risk_counts >= 3) | (low_risk_counts >= 3)).sum()),
+            'agent_agreement_analysis': {},
+            'double_penalty_instances': int(double_penalty.sum())
+        }